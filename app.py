@@ -2,35 +2,55 @@ import streamlit as st
 import pandas as pd
 import calendar
 from datetime import datetime, timedelta
-import base64
-import random
+import hashlib
+import numpy as np
 from PIL import Image
 import io
-from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer, PageBreak
 from reportlab.lib.units import inch
 from io import BytesIO
 import urllib.parse
+from collections import namedtuple
+from pdf_cache import pdf_cache_key
+from pdf_template import blob_image, optimized_image, pdf_size_report, pdf_template
+from pdf_jobs import cancel_job, job_result, job_status, submit_pdf
+from screenshots import favicon, process_screenshots
+from blob_store import blob_path, put_blob, retain_blobs, touch_session
+from streamlit.errors import StreamlitAPIException
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from holiday_calendar import DEFAULT_LOCATION, WEEKEND, HOLIDAY, available_years, day_index, get_holidays, in_month, month_calendar, month_holidays, working_dates
 
-HOLIDAYS_2025 = {
-    "01/01/2025": "New Year",
-    "01/14/2025": "Makara sankranti",
-    "02/26/2025": "Maha Shivaratri",
-    "05/01/2025": "May Day",
-    "08/15/2025": "Independence Day",
-    "08/27/2025": "Ganesh Chaturthi",
-    "09/05/2025": "Eid -E- Milad",
-    "10/01/2025": "Ayudha Pooja",
-    "10/02/2025": "Gandhi Jayanthi",
-    "10/22/2025": "Deepavali",
-    "12/25/2025": "Christmas"
+# Lookup tables so a whole column of minute counts can be formatted with one fancy-index
+CLOCK_STRINGS = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(24 * 60)], dtype=object)
+DURATION_STRINGS = np.array([f"{m // 60}:{m % 60:02d}" for m in range(24 * 60)], dtype=object)
+
+TIMESHEET_COLUMNS = pd.Index(["Date", "Time-In", "Time-out", "Hours", "WFO/WFH", "Job Description"])
+
+# Row classification is stored once at creation; times are stored as minutes and only formatted for display
+DAY_TYPE_NAMES = np.array(["Working", "Week Off", "Holiday", "Sick Leave", "Earned Leave"], dtype=object)
+DAY_TYPES = pd.CategoricalDtype(DAY_TYPE_NAMES)
+WORK_LOCATIONS = pd.CategoricalDtype(["", "WFO", "WFH"])
+LEAVE_TYPES = ["Sick Leave", "Earned Leave"]
+DEFAULT_MANAGER = "Nikhil M"
+# How often a PDF preview that is still building checks its job
+PDF_POLL_SECONDS = 0.5
+
+TimesheetMetrics = namedtuple("TimesheetMetrics", [
+    "working_days", "sick_leaves", "earned_leaves", "wfh_days", "wfo_days", "total_hours", "avg_hours_per_day"
+])
+
+TABLE_ROW_COLORS = {
+    "Holiday": "background-color: #FFE0B2",
+    "Week Off": "background-color: #FFF9C4",
+    "Sick Leave": "background-color: #C8E6C9",
+    "Earned Leave": "background-color: #C8E6C9",
+    "WFH": "background-color: #E3F2FD",
 }
 
 def process_signature(uploaded_file):
     if uploaded_file is not None:
-        image_bytes = uploaded_file.read()
+        image_bytes = uploaded_file.getvalue()
         image = Image.open(io.BytesIO(image_bytes))
         if image.mode != 'RGB':
             image = image.convert('RGB')
@@ -38,113 +58,122 @@ def process_signature(uploaded_file):
         image.thumbnail(max_size, Image.Resampling.LANCZOS)
         img_byte_arr = io.BytesIO()
         image.save(img_byte_arr, format='PNG')
-        img_byte_arr = img_byte_arr.getvalue()
-        return img_byte_arr
+        return put_blob(img_byte_arr.getvalue())
     return None
 
-def process_screenshots(uploaded_files):
-    processed_images = []
-    if uploaded_files:
-        for uploaded_file in uploaded_files:
-            image_bytes = uploaded_file.read()
-            image = Image.open(io.BytesIO(image_bytes))
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            img_byte_arr = io.BytesIO()
-            image.save(img_byte_arr, format='PNG', quality=95)
-            processed_images.append(img_byte_arr.getvalue())
-    return processed_images
-
-def generate_random_time():
-    minutes = random.randint(0, 70)
-    hours = 9
-    total_minutes = hours * 60 + minutes
-    work_duration = random.randint(540, 570)
-    out_time_minutes = total_minutes + work_duration
-    in_time = f"{str(total_minutes // 60).zfill(2)}:{str(total_minutes % 60).zfill(2)}"
-    out_time = f"{str(out_time_minutes // 60).zfill(2)}:{str(out_time_minutes % 60).zfill(2)}"
-    hours_worked = f"{work_duration // 60}:{str(work_duration % 60).zfill(2)}"
-    return in_time, out_time, hours_worked
-
-def get_weekends_for_month(year, month):
-    num_days = calendar.monthrange(year, month)[1]
-    weekends = []
-    for day in range(1, num_days + 1):
-        current_date = datetime(year, month, day)
-        if current_date.weekday() >= 5:
-            weekends.append(current_date.strftime("%m/%d/%Y"))
-    return weekends
-
-def get_dates_for_month(year, month):
-    num_days = calendar.monthrange(year, month)[1]
-    dates = []
-    weekends = get_weekends_for_month(year, month)
-    for day in range(1, num_days + 1):
-        date_str = datetime(year, month, day).strftime("%m/%d/%Y")
-        if date_str not in weekends and date_str not in HOLIDAYS_2025:
-            dates.append(date_str)
-    return dates
+def current_session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "local"
+
+def timesheet_seed(employee_id, year, month):
+    # Stable across processes (unlike hash()), so a month can be regenerated or cached
+    digest = hashlib.sha256(f"{employee_id}:{year}:{month}".encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+def generate_random_times(rng, size):
+    # One draw for the whole month: column 0 is the minutes after 9:00, column 1 the work duration
+    draws = rng.integers([0, 540], [71, 571], size=(size, 2))
+    in_minutes = 9 * 60 + draws[:, 0]
+    work_duration = draws[:, 1]
+    return in_minutes, in_minutes + work_duration, work_duration
+
+def get_dates_for_month(year, month, location=DEFAULT_LOCATION):
+    return list(working_dates(year, month, location))
 
 def create_timesheet(year, month, employee_data, projects, leave_dates, wfh_dates):
-    num_days = calendar.monthrange(year, month)[1]
-    weekends = get_weekends_for_month(year, month)
-    dates = [datetime(year, month, day) for day in range(1, num_days + 1)]
-    timesheet_data = []
+    date_strs, day_types, holiday_labels = month_calendar(year, month, employee_data["location"])
+    num_days = len(date_strs)
     
     default_projects = "\n".join(f"{i+1}. {project}" for i, project in enumerate(projects))
     
-    for date in dates:
-        date_str = date.strftime("%m/%d/%Y")
-        time_in, time_out, hours = ("9:00", "18:00", "9:00")
-        work_location = "WFO"  # Default to Work From Office
-        
-        # Determine work location
-        if date_str in wfh_dates:
-            work_location = "WFH"
-        
-        if date_str not in weekends and date_str not in HOLIDAYS_2025 and date_str not in leave_dates:
-            time_in, time_out, hours = generate_random_time()
-        
-        entry = {
-            "Date": date_str,
-            "Time-In": time_in,
-            "Time-out": time_out,
-            "Hours": hours,
-            "WFO/WFH": work_location,
-            "Job Description": default_projects
-        }
-        
-        if date_str in HOLIDAYS_2025:
-            entry.update({
-                "WFO/WFH": "",
-                "Job Description": HOLIDAYS_2025[date_str],
-                "Time-In": "9:00",
-                "Time-out": "18:00",
-                "Hours": "9:00"
-            })
-        elif date_str in leave_dates:
-            leave_type = leave_dates[date_str]
-            entry.update({
-                "WFO/WFH": "",
-                "Job Description": leave_type,
-                "Time-In": "9:00",
-                "Time-out": "18:00",
-                "Hours": "9:00"
-            })
-        elif date_str in weekends:
-            entry.update({
-                "WFO/WFH": "",
-                "Job Description": "Week Off",
-                "Time-In": "9:00",
-                "Time-out": "18:00",
-                "Hours": "9:00"
-            })
-            
-        timesheet_data.append(entry)
-    
-    return pd.DataFrame(timesheet_data)
-
-def create_pdf(df, employee_data, month_year, employee_signature=None, screenshots=None):
+    # Dates outside the month are ignored
+    leave_codes = np.full(num_days, -1, dtype=np.int8)
+    for date_str, leave_type in leave_dates.items():
+        if in_month(date_str, year, month):
+            leave_codes[day_index(date_str)] = DAY_TYPES.categories.get_loc(leave_type)
+    is_weekend = day_types == WEEKEND
+    is_holiday = day_types == HOLIDAY
+    is_leave = leave_codes >= 0
+    is_off = is_weekend | is_holiday | is_leave
+    is_wfh = np.zeros(num_days, dtype=bool)
+    is_wfh[[day_index(date_str) for date_str in wfh_dates if in_month(date_str, year, month)]] = True
+    
+    # Holidays win over leave, leave wins over weekends
+    day_type_codes = np.where(is_weekend, 1, 0).astype(np.int8)
+    day_type_codes[is_leave] = leave_codes[is_leave]
+    day_type_codes[is_holiday] = 2
+    
+    rng = np.random.default_rng(timesheet_seed(employee_data["id"], year, month))
+    in_minutes, out_minutes, work_duration = generate_random_times(rng, num_days)
+    
+    job_description = np.full(num_days, default_projects, dtype=object)
+    job_description[is_off] = DAY_TYPE_NAMES[day_type_codes[is_off]]
+    job_description[is_holiday] = holiday_labels[is_holiday]
+    
+    return pd.DataFrame({
+        "Date": date_strs,
+        "Time-In": np.where(is_off, 9 * 60, in_minutes).astype(np.int16),
+        "Time-out": np.where(is_off, 18 * 60, out_minutes).astype(np.int16),
+        "Hours": np.where(is_off, 9 * 60, work_duration).astype(np.int16),
+        "WFO/WFH": pd.Categorical.from_codes(np.where(is_off, 0, np.where(is_wfh, 2, 1)), dtype=WORK_LOCATIONS),
+        "Job Description": job_description,
+        "DayType": pd.Categorical.from_codes(day_type_codes, dtype=DAY_TYPES)
+    })
+
+def project_grid(df, projects):
+    # One row per working day (indexed by its row in df), one checkbox column per project
+    working = np.flatnonzero((df["DayType"] == "Working").to_numpy())
+    grid = pd.DataFrame({
+        "Date": df["Date"].to_numpy(dtype=object)[working],
+        "Location": np.where(df["WFO/WFH"].to_numpy(dtype=object)[working] == "WFH", "🏠 WFH", "🏢 WFO")
+    }, index=working)
+    for column in project_columns(projects):
+        grid[column] = True
+    return grid
+
+def project_columns(projects):
+    return [f"{i+1}. {project}" for i, project in enumerate(projects)]
+
+def apply_day_edits(df, grid, projects, edited_rows, applied):
+    """Write the grid cells changed since the last call into df's Job Description, in place."""
+    columns = project_columns(projects)
+    for row in set(applied) | set(edited_rows):
+        changes = edited_rows.get(row, {})
+        if applied.get(row) == changes:
+            continue
+        selected = [project for project, column in zip(projects, columns) if changes.get(column, grid.at[grid.index[row], column])]
+        df.at[grid.index[row], "Job Description"] = "\n".join(f"{i+1}. {project}" for i, project in enumerate(selected))
+        if changes:
+            applied[row] = dict(changes)
+        else:
+            applied.pop(row, None)
+
+def format_timesheet(df):
+    # Display strings for the PDF and the on-screen table; non-working days show the nominal 9:00-18:00
+    is_working = (df["DayType"] == "Working").to_numpy()
+    columns = np.column_stack([
+        df["Date"].to_numpy(dtype=object),
+        np.where(is_working, CLOCK_STRINGS[df["Time-In"].to_numpy()], "9:00"),
+        np.where(is_working, CLOCK_STRINGS[df["Time-out"].to_numpy()], "18:00"),
+        np.where(is_working, DURATION_STRINGS[df["Hours"].to_numpy()], "9:00"),
+        df["WFO/WFH"].to_numpy(dtype=object),
+        df["Job Description"].to_numpy(dtype=object)
+    ])
+    return pd.DataFrame(columns, index=df.index, columns=TIMESHEET_COLUMNS, dtype=object)
+
+def row_style_keys(df):
+    # Keys into pdf_template.PDF_ROW_COLORS / TABLE_ROW_COLORS: the day type, or the work location on working days
+    return np.where(
+        (df["DayType"] == "Working").to_numpy(),
+        df["WFO/WFH"].to_numpy(dtype=object),
+        df["DayType"].to_numpy(dtype=object)
+    )
+
+def create_pdf(df, employee_data, month_year, employee_signature=None, screenshots=None, optimize_size=False, progress=None):
+    """optimize_size downsamples and recompresses the images for email (see pdf_template.compact_image).
+
+    progress, if given, is called with (flowables laid out, flowables in total) as the document builds.
+    """
     buffer = BytesIO()
     doc = SimpleDocTemplate(
         buffer,
@@ -154,24 +183,24 @@ def create_pdf(df, employee_data, month_year, employee_signature=None, screensho
         topMargin=20,
         bottomMargin=20
     )
+    if progress:
+        total = 0
+        def on_progress(event, value):
+            nonlocal total
+            if event == "SIZE_EST":
+                total = value
+            elif event == "PROGRESS":
+                progress(value, total)
+        doc.setProgressCallBack(on_progress)
     
-    story = []
-    styles = getSampleStyleSheet()
-    
-    # Logo
-    logo_path = "aideas_logo.png"
-    if logo_path:
-        logo = RLImage(logo_path, width=2*inch, height=0.8*inch)
-        story.append(logo)
-    story.append(Spacer(1, 20))
+    template = pdf_template()
+    story = [template.logo(), Spacer(1, 20)]
     
     # Title
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=16, spaceAfter=20, alignment=1)
-    title = Paragraph(f"Timesheet - {calendar.month_name[month_year[0]]} {month_year[1]}", title_style)
+    title = Paragraph(f"Timesheet - {calendar.month_name[month_year[0]]} {month_year[1]}", template.title_style)
     story.append(title)
     
     # Employee Info
-    info_style = ParagraphStyle('Info', parent=styles['Normal'], fontSize=10, spaceAfter=3)
     employee_info = [
         f"Employee Name: {employee_data['name']}",
         f"Employee ID: {employee_data['id']}",
@@ -179,97 +208,56 @@ def create_pdf(df, employee_data, month_year, employee_signature=None, screensho
         f"Manager: {employee_data['manager']}"
     ]
     for info in employee_info:
-        story.append(Paragraph(info, info_style))
+        story.append(Paragraph(info, template.info_style))
     
     story.append(Spacer(1, 30))
 
     # Timesheet Table
-    table_data = [df.columns.tolist()]
-    para_style = ParagraphStyle('CustomBody', parent=styles['Normal'], fontSize=8, leading=10, spaceBefore=0, spaceAfter=0, leftIndent=0, rightIndent=0)
-    
-    for _, row in df.iterrows():
-        processed_row = []
-        for col in df.columns:
-            cell_value = str(row[col])
-            if col == 'Job Description':
-                cell_value = Paragraph(cell_value.replace('\n', '<br/>'), para_style)
-            processed_row.append(cell_value)
+    display_df = format_timesheet(df)
+    table_data = [display_df.columns.tolist()]
+    
+    for row in display_df.itertuples(index=False):
+        processed_row = list(row)
+        processed_row[-1] = Paragraph(processed_row[-1].replace('\n', '<br/>'), template.body_style)
         table_data.append(processed_row)
     
     col_widths = [1.0*inch, 0.8*inch, 0.8*inch, 0.7*inch, 0.7*inch, 3.5*inch]
     table = Table(table_data, repeatRows=1, colWidths=col_widths)
-    
-    table_style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('TOPPADING', (0, 0), (-1, 0), 8),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('ALIGN', (5, 0), (5, -1), 'LEFT'),
-        ('VALIGN', (5, 0), (5, -1), 'TOP'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('INNERGRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('BOX', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 4),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-        ('TOPPADDING', (0, 1), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-    ])
-    
-    # Apply different background colors for different row types
-    for row_idx, row in enumerate(table_data[1:], 1):
-        job_desc = str(row[-1])
-        wfo_wfh = str(row[4])  # WFO/WFH column
-        
-        if any(holiday in job_desc for holiday in HOLIDAYS_2025.values()):
-            table_style.add('BACKGROUND', (0, row_idx), (-1, row_idx), colors.Color(1, 0.9, 0.8))
-        elif 'Week Off' in job_desc:
-            table_style.add('BACKGROUND', (0, row_idx), (-1, row_idx), colors.Color(1, 0.98, 0.9))
-        elif 'Sick Leave' in job_desc or 'Earned Leave' in job_desc:
-            table_style.add('BACKGROUND', (0, row_idx), (-1, row_idx), colors.Color(0.784, 0.902, 0.788))
-        elif wfo_wfh == 'WFH':
-            # Light blue background for WFH days
-            table_style.add('BACKGROUND', (0, row_idx), (-1, row_idx), colors.Color(0.9, 0.95, 1.0))
-    
-    table.setStyle(table_style)
+    # Base commands plus a precomputed background command per coloured row
+    table.setStyle(template.table_style(row_style_keys(df)))
     story.append(table)
     
     # Employee Signature
     story.append(Spacer(1, 30))
     if employee_signature:
-        sig_img = RLImage(io.BytesIO(employee_signature), width=1.5*inch, height=0.75*inch)
+        if optimize_size:
+            sig_img = optimized_image(f"signature.{employee_signature}", employee_signature, 1.5*inch, 0.75*inch)
+        else:
+            sig_img = blob_image(f"signature.{employee_signature}", employee_signature, 1.5*inch, 0.75*inch)
         signature_table = Table([["Employee Signature:", sig_img]], colWidths=[2*inch, 2*inch])
     else:
         signature_table = Table([["Employee Signature:", "_________________"]], colWidths=[2*inch, 2*inch])
     
-    signature_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONT', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-    ]))
+    signature_table.setStyle(template.signature_style)
     story.append(signature_table)
 
     # Screenshots
     if screenshots:
         story.append(PageBreak())
-        story.append(Paragraph("SAP Screenshots", title_style))
+        story.append(Paragraph("SAP Screenshots", template.title_style))
         story.append(Spacer(1, 20))
         for screenshot in screenshots:
-            img = Image.open(io.BytesIO(screenshot))
-            width, height = img.size
-            aspect_ratio = width / height
+            aspect_ratio = screenshot.width / screenshot.height
             max_width = 500  # Fit within A4 width (595 points)
             max_height = max_width / aspect_ratio
             if max_height > 700:  # Limit height to fit A4 (842 points)
                 max_height = 700
                 max_width = max_height * aspect_ratio
-            img = RLImage(io.BytesIO(screenshot), width=max_width, height=max_height, hAlign='CENTER')
+            # Named by digest, so a screenshot attached twice is stored once
+            if optimize_size:
+                img = optimized_image(f"screenshot.{screenshot.digest}", screenshot.digest, max_width, max_height)
+            else:
+                img = blob_image(f"screenshot.{screenshot.digest}", screenshot.digest, max_width, max_height)
             story.append(img)
             story.append(Spacer(1, 20))
 
@@ -278,22 +266,23 @@ def create_pdf(df, employee_data, month_year, employee_signature=None, screensho
     buffer.close()
     return pdf_data
 
+def timesheet_pdf_job(df, employee_data, month_year, employee_signature=None, screenshots=None, optimize_size=False):
+    # Rendering runs in the PDF job pool; reruns with unchanged inputs get the cached PDF or the job already running
+    key = pdf_cache_key(df, employee_data, month_year, employee_signature, screenshots, optimize_size)
+    return submit_pdf(key, df, employee_data, month_year, employee_signature, screenshots, optimize_size)
+
+def pdf_file_name(employee_data, month, year):
+    return f"{employee_data['id']}_{employee_data['name'].replace(' ', '')}_{calendar.month_name[month].lower()}-{year}.pdf"
+
 def style_dataframe(df):
-    def highlight_rows(row):
-        job_desc = str(row['Job Description'])
-        wfo_wfh = str(row['WFO/WFH'])
-        
-        if any(holiday in job_desc for holiday in HOLIDAYS_2025.values()):
-            return ['background-color: #FFE0B2'] * len(row)
-        elif 'Week Off' in job_desc:
-            return ['background-color: #FFF9C4'] * len(row)
-        elif 'Sick Leave' in job_desc or 'Earned Leave' in job_desc:
-            return ['background-color: #C8E6C9'] * len(row)
-        elif wfo_wfh == 'WFH':
-            return ['background-color: #E3F2FD'] * len(row)  # Light blue for WFH
-        return [''] * len(row)
-    
-    styled_df = df.style.apply(highlight_rows, axis=1)
+    display_df = format_timesheet(df)
+    row_css = np.array([TABLE_ROW_COLORS.get(key, '') for key in row_style_keys(df)], dtype=object)
+    css = pd.DataFrame(
+        np.repeat(row_css[:, None], len(display_df.columns), axis=1),
+        index=display_df.index,
+        columns=display_df.columns
+    )
+    styled_df = display_df.style.apply(lambda _: css, axis=None)
     return styled_df
 
 def create_outlook_url(recipient_email, subject, body):
@@ -303,8 +292,9 @@ def create_outlook_url(recipient_email, subject, body):
     outlook_url = f"mailto:{recipient_email}?subject={subject}&cc={cc}&body={body}"
     return outlook_url
 
-def save_and_open_email(recipient_email, month_year, employee_data, df, has_screenshots=False):
-    working_days, sick_leaves, earned_leaves, wfh_days, wfo_days = calculate_metrics(df)
+def save_and_open_email(recipient_email, month_year, employee_data, df, has_screenshots=False, metrics=None):
+    if metrics is None:
+        metrics = calculate_metrics(df)
     subject = f"Aideas || Approval for Timesheet || {calendar.month_name[month_year[0]]}-{month_year[1]}"
     body = f"""Dear {employee_data['manager']},
 
@@ -313,87 +303,173 @@ As per above mentioned I am submitting my timesheet for {calendar.month_name[mon
 Please find attached my completed timesheet{f" with screenshots" if has_screenshots else ""}. After this email opens in Outlook, please attach the downloaded PDF.
 
 I have carefully recorded all my work hours, including:
-1. Work From Office (WFO) days: {wfo_days} Days
-2. Work From Home (WFH) days: {wfh_days} Days          
-3. Sick Leave taken: {sick_leaves} Days
-4. Earned Leave taken: {earned_leaves} Days
+1. Work From Office (WFO) days: {metrics.wfo_days} Days
+2. Work From Home (WFH) days: {metrics.wfh_days} Days          
+3. Sick Leave taken: {metrics.sick_leaves} Days
+4. Earned Leave taken: {metrics.earned_leaves} Days
 
-Total Working Days: {working_days} Days
+Total Working Days: {metrics.working_days} Days
 
 I have ensured that all project work is accurately reflected in the timesheet."""
     outlook_url = create_outlook_url(recipient_email, subject, body)
     return outlook_url
 
 def display_pdf(pdf_data):
-    base64_pdf = base64.b64encode(pdf_data).decode('utf-8')
-    st.markdown(f"""<embed src="data:application/pdf;base64,{base64_pdf}" width="100%" height="800" type="application/pdf"></embed>""", unsafe_allow_html=True)
+    # st.pdf hands the bytes to the media file store and the viewer fetches them over HTTP, so the
+    # document never travels base64-encoded through the websocket
+    try:
+        st.pdf(pdf_data, height=800)
+    except StreamlitAPIException:
+        st.info("PDF preview needs the streamlit-pdf component (pip install streamlit[pdf]). Use Download PDF instead.")
 
-def calculate_metrics(df):
-    working_days = len([row for _, row in df.iterrows() if row['Job Description'] not in ['Sick Leave', 'Earned Leave'] and 'Week Off' not in row['Job Description'] and row['Job Description'] not in HOLIDAYS_2025.values()])
-    sick_leaves = len([row for _, row in df.iterrows() if row['Job Description'] == 'Sick Leave'])
-    earned_leaves = len([row for _, row in df.iterrows() if row['Job Description'] == 'Earned Leave'])
-    wfh_days = len([row for _, row in df.iterrows() if row['WFO/WFH'] == 'WFH'])
-    wfo_days = len([row for _, row in df.iterrows() if row['WFO/WFH'] == 'WFO'])
-    return working_days, sick_leaves, earned_leaves, wfh_days, wfo_days
+def pdf_size_caption(pdf_data):
+    sections = ", ".join(f"{section} {size / 1024:,.0f} KB" for section, size in pdf_size_report(pdf_data).items())
+    return f"PDF size {len(pdf_data) / 1024:,.0f} KB: {sections}"
 
-def main():
-    st.set_page_config(
-        page_title="Aideas Timesheet",
-        page_icon="aideas_logo.png"
-    )
-    
-    st.title("Aideas Timesheet Generator - 2025")
+def metrics_arrays(frames):
+    # Counts and worked minutes per (frame, day type, location) cell, from one bincount over all frames
+    num_locations = len(WORK_LOCATIONS.categories)
+    num_cells = len(DAY_TYPES.categories) * num_locations
+    frame_ids = np.repeat(np.arange(len(frames)), [len(df) for df in frames])
+    # The empty leading arrays keep concatenate working (and typed) when there are no frames
+    cells = np.concatenate([np.zeros(0, dtype=np.intp)] + [
+        df['DayType'].cat.codes.to_numpy() * num_locations + df['WFO/WFH'].cat.codes.to_numpy()
+        for df in frames
+    ]) + frame_ids * num_cells
+    minutes = np.concatenate([np.zeros(0)] + [df['Hours'].to_numpy() for df in frames])
+    shape = (len(frames), len(DAY_TYPES.categories), num_locations)
+    counts = np.bincount(cells, minlength=len(frames) * num_cells).reshape(shape)
+    worked = np.bincount(cells, weights=minutes, minlength=len(frames) * num_cells).reshape(shape)
     
-    # Initialize session state
-    if 'timesheet_generated' not in st.session_state:
-        st.session_state.timesheet_generated = False
-    if 'timesheet_df' not in st.session_state:
-        st.session_state.timesheet_df = None
-    if 'screenshots' not in st.session_state:
-        st.session_state.screenshots = []
+    working = DAY_TYPES.categories.get_loc("Working")
+    working_days = counts[:, working].sum(axis=1)
+    total_hours = worked[:, working].sum(axis=1) / 60
+    return {
+        "working_days": working_days,
+        "sick_leaves": counts[:, DAY_TYPES.categories.get_loc("Sick Leave")].sum(axis=1),
+        "earned_leaves": counts[:, DAY_TYPES.categories.get_loc("Earned Leave")].sum(axis=1),
+        "wfh_days": counts[:, :, WORK_LOCATIONS.categories.get_loc("WFH")].sum(axis=1),
+        "wfo_days": counts[:, :, WORK_LOCATIONS.categories.get_loc("WFO")].sum(axis=1),
+        "total_hours": total_hours,
+        "avg_hours_per_day": np.divide(total_hours, working_days, out=np.zeros(len(frames)), where=working_days > 0)
+    }
+
+def calculate_metrics(df):
+    metrics = metrics_arrays([df])
+    return TimesheetMetrics(
+        *(int(metrics[field][0]) for field in TimesheetMetrics._fields[:5]),
+        float(metrics["total_hours"][0]),
+        float(metrics["avg_hours_per_day"][0])
+    )
+
+def rollup_metrics(timesheets, period="quarter"):
+    # timesheets maps (employee_id, year, month) -> timesheet frame; period is "month", "quarter" or "year"
+    keys = pd.DataFrame(list(timesheets), columns=["Employee ID", "Year", "Month"])
+    metrics = keys.assign(**metrics_arrays(list(timesheets.values())))
+    group_by = ["Employee ID", "Year"]
+    if period == "quarter":
+        metrics["Quarter"] = (metrics["Month"] - 1) // 3 + 1
+        group_by.append("Quarter")
+    elif period == "month":
+        group_by.append("Month")
+    elif period != "year":
+        raise ValueError(f"Unknown period: {period}")
     
-    # Employee Information
+    totals = metrics.groupby(group_by)[list(TimesheetMetrics._fields[:6])].sum()
+    totals["avg_hours_per_day"] = (totals["total_hours"] / totals["working_days"].where(totals["working_days"] > 0)).fillna(0.0)
+    return totals
+
+def in_fragment_rerun():
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+def calendar_frame(year, month):
+    return pd.DataFrame(calendar.monthcalendar(year, month), columns=['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])
+
+# Each panel is a fragment, so a widget inside it reruns only that panel. Panels share state through
+# st.session_state:
+#   employee_panel   writes main_emp_name, main_emp_id (widget keys)
+#   upload_panel     writes signature_digest, screenshots
+#   selection_panel  reads the employee fields; Generate writes timesheet_df, timesheet_projects, project_grid,
+#                    employee_data, timesheet_period
+#   timesheet_panel  reads all of the above; the day editor writes timesheet_df in place; the preview writes
+#                    pdf_job (its PDF job id)
+# A panel that changes something another panel has already drawn asks for a full rerun.
+
+@st.fragment
+def employee_panel():
     st.header("Employee Information")
     col1, col2 = st.columns(2)
     with col1:
-        employee_name = st.text_input("Employee Name", key="main_emp_name")
-        employee_id = st.text_input("Employee ID", key="main_emp_id")
-    
-    location = "ABB Southfield"
-    manager = "Nikhil M"
-    
+        st.text_input("Employee Name", key="main_emp_name")
+        st.text_input("Employee ID", key="main_emp_id")
     with col2:
-        st.text_input("Work Location", value=location, disabled=True, key="main_location")
-        st.text_input("Manager", value=manager, disabled=True, key="main_manager")
+        st.text_input("Work Location", value=DEFAULT_LOCATION, disabled=True, key="main_location")
+        st.text_input("Manager", value=DEFAULT_MANAGER, disabled=True, key="main_manager")
 
+@st.fragment
+def upload_panel():
     # Signature Upload
     st.header("Signature Upload")
     employee_signature = st.file_uploader("Upload Employee Signature", type=['png', 'jpg', 'jpeg'], key="signature_upload")
     if employee_signature:
         st.image(employee_signature, width=200)
+        # Processed once per upload, not on every rerun; again if the blob was evicted while the session sat idle
+        cache = st.session_state.signature_cache
+        if cache.get("file_id") != employee_signature.file_id or not blob_path(cache["digest"]).exists():
+            st.session_state.signature_cache = {"file_id": employee_signature.file_id, "digest": process_signature(employee_signature)}
+    else:
+        st.session_state.signature_cache = {}
+    signature_digest = st.session_state.signature_cache.get("digest")
     
     # SAP Screenshots
     st.header("SAP Screenshots")
     screenshot_files = st.file_uploader("Upload SAP Screenshots", type=['png', 'jpg', 'jpeg'], accept_multiple_files=True, key="screenshot_upload")
+    screenshots = process_screenshots(screenshot_files, st.session_state.screenshot_cache)
+    # Keep this session's uploads pinned in the blob store; anything it no longer uses becomes evictable
+    session_blobs = [screenshot.digest for screenshot in screenshots]
+    if signature_digest:
+        session_blobs.append(signature_digest)
+    retain_blobs(current_session_id(), session_blobs)
     if screenshot_files:
-        st.session_state.screenshots = process_screenshots(screenshot_files)
+        duplicates = len(screenshot_files) - len(screenshots)
+        if duplicates:
+            st.caption(f"Skipped {duplicates} duplicate screenshot{'s' if duplicates > 1 else ''}")
         st.write("Uploaded Screenshots:")
-        for i, screenshot in enumerate(st.session_state.screenshots):
-            st.image(Image.open(io.BytesIO(screenshot)), caption=f"Screenshot {i+1}", width=200)
+        for i, screenshot in enumerate(screenshots):
+            st.image(screenshot.thumbnail, caption=f"Screenshot {i+1}", width=200)
+    
+    changed = (signature_digest != st.session_state.signature_digest
+               or [s.digest for s in screenshots] != [s.digest for s in st.session_state.screenshots])
+    st.session_state.signature_digest = signature_digest
+    st.session_state.screenshots = screenshots
+    # The timesheet output below was drawn with the old uploads
+    if changed and st.session_state.timesheet_generated and in_fragment_rerun():
+        st.rerun()
 
+@st.fragment
+def selection_panel():
+    location = DEFAULT_LOCATION
+    
     # Month Selection
     st.header("Select Month")
-    month = st.selectbox("Month", range(1, 13), format_func=lambda x: calendar.month_name[x], key="month_select")
-    st.write("### Calendar for Selected Month (2025)")
-    cal = calendar.monthcalendar(2025, month)
-    days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-    df_calendar = pd.DataFrame(cal, columns=days)
-    st.dataframe(df_calendar, hide_index=True)
-    
-    month_holidays = {date: holiday for date, holiday in HOLIDAYS_2025.items() if int(date.split('/')[0]) == month}
-    if month_holidays:
+    # The current and previous year are always offered; their calendars work without holiday data
+    this_year = datetime.now().year
+    years = sorted(set(available_years(location)) | {this_year - 1, this_year})
+    col1, col2 = st.columns(2)
+    with col1:
+        year = st.selectbox("Year", years, index=years.index(this_year), key="year_select")
+    with col2:
+        month = st.selectbox("Month", range(1, 13), format_func=lambda x: calendar.month_name[x], key="month_select")
+    if not get_holidays(year, location):
+        st.warning(f"No holidays are listed for {location} in {year}; add them to holidays.json")
+    st.write(f"### Calendar for Selected Month ({year})")
+    st.dataframe(calendar_frame(year, month), hide_index=True)
+    
+    holidays_this_month = month_holidays(year, month, location)
+    if holidays_this_month:
         st.write("### Holidays this month:")
-        for date, holiday in month_holidays.items():
+        for date, holiday in holidays_this_month.items():
             st.write(f"- {date}: {holiday}")
     
     # Work From Home Selection
@@ -401,7 +477,7 @@ def main():
     show_wfh_section = st.checkbox("Select Work From Home Dates", key="show_wfh")
     wfh_dates = []
     if show_wfh_section:
-        available_dates = get_dates_for_month(2025, month)
+        available_dates = get_dates_for_month(year, month, location)
         wfh_dates = st.multiselect(
             "Select Work From Home Dates", 
             available_dates, 
@@ -416,7 +492,7 @@ def main():
     show_leave_section = st.checkbox("Add Leave Dates", key="show_leave")
     leave_dates = {}
     if show_leave_section:
-        available_dates = get_dates_for_month(2025, month)
+        available_dates = get_dates_for_month(year, month, location)
         # Remove WFH dates from available leave dates to avoid conflicts
         available_leave_dates = [date for date in available_dates if date not in wfh_dates]
         
@@ -444,95 +520,193 @@ def main():
             projects.append(project)
     
     if st.button("Generate Timesheet", key="generate_btn"):
+        employee_name = st.session_state.main_emp_name
+        employee_id = st.session_state.main_emp_id
         if not employee_name or not employee_id:
             st.error("Please enter Employee Name and Employee ID")
             return
         if not projects:
             st.error("Please add at least one project description")
             return
-        employee_data = {"name": employee_name, "id": employee_id, "location": location, "manager": manager}
-        st.session_state.timesheet_df = create_timesheet(2025, month, employee_data, projects, leave_dates, wfh_dates)
+        employee_data = {"name": employee_name, "id": employee_id, "location": location, "manager": DEFAULT_MANAGER}
+        projects = list(dict.fromkeys(projects))
+        st.session_state.timesheet_df = create_timesheet(year, month, employee_data, projects, leave_dates, wfh_dates)
+        st.session_state.timesheet_projects = projects
+        st.session_state.project_grid = project_grid(st.session_state.timesheet_df, projects)
+        st.session_state.applied_day_edits = {}
+        st.session_state.pop("day_editor", None)
         st.session_state.timesheet_generated = True
         st.session_state.employee_data = employee_data
+        st.session_state.timesheet_period = (month, year)
+        # The timesheet panel further down has to be drawn for the new month
+        if in_fragment_rerun():
+            st.rerun()
+
+@st.fragment
+def timesheet_panel():
+    if not st.session_state.timesheet_generated or st.session_state.timesheet_df is None:
+        return
+    month, year = st.session_state.timesheet_period
     
-    if st.session_state.timesheet_generated and st.session_state.timesheet_df is not None:
-        # Enhanced Metrics
-        working_days, sick_leaves, earned_leaves, wfh_days, wfo_days = calculate_metrics(st.session_state.timesheet_df)
-        
-        # Display metrics in a more organized way
-        st.header("Monthly Summary")
-        metrics_col1, metrics_col2, metrics_col3, metrics_col4, metrics_col5 = st.columns(5)
-        with metrics_col1:
-            st.metric("Total Working Days", working_days)
-        with metrics_col2:
-            st.metric("WFO Days", wfo_days)
-        with metrics_col3:
-            st.metric("WFH Days", wfh_days)
-        with metrics_col4:
-            st.metric("Sick Leaves", sick_leaves)
-        with metrics_col5:
-            st.metric("Earned Leaves", earned_leaves)
-
-        # Edit Job Descriptions
-        st.header("Edit Daily Job Descriptions")
-        st.write("You can modify job descriptions for specific dates below:")
-        edited_df = st.session_state.timesheet_df.copy()
-        for idx, row in edited_df.iterrows():
-            if (row['Job Description'] not in HOLIDAYS_2025.values() and 
-                row['Job Description'] != 'Week Off' and 
-                row['Job Description'] not in ['Sick Leave', 'Earned Leave']):
-                
-                # Show work location info
-                work_location = "🏠 Work From Home" if row['WFO/WFH'] == 'WFH' else "🏢 Work From Office"
-                st.write(f"**Date: {row['Date']}** - {work_location}")
-                
-                try:
-                    current_projects = row['Job Description'].split('\n')
-                    current_projects = [p.split('. ')[1] if '. ' in p else p for p in current_projects if p.strip()]
-                    default_values = [p for p in current_projects if p in projects] if current_projects else []
-                    selected_projects = st.multiselect("Select projects for this day", projects, default=default_values, key=f"proj_{idx}")
-                    if selected_projects or selected_projects == []:
-                        new_description = "\n".join(f"{i+1}. {proj}" for i, proj in enumerate(selected_projects)) if selected_projects else ""
-                        edited_df.at[idx, 'Job Description'] = new_description
-                except Exception as e:
-                    st.error(f"Error processing projects for {row['Date']}: {str(e)}")
-                st.write("---")
-        st.session_state.timesheet_df = edited_df
-
-        # Generate PDF
-        processed_emp_sig = process_signature(employee_signature) if employee_signature else None
-        pdf_data = create_pdf(
-            edited_df,
-            st.session_state.employee_data,
-            (month, 2025),
-            processed_emp_sig,
-            st.session_state.screenshots
+    # Enhanced Metrics
+    metrics = calculate_metrics(st.session_state.timesheet_df)
+    
+    # Display metrics in a more organized way
+    st.header("Monthly Summary")
+    metrics_col1, metrics_col2, metrics_col3, metrics_col4, metrics_col5 = st.columns(5)
+    with metrics_col1:
+        st.metric("Total Working Days", metrics.working_days)
+    with metrics_col2:
+        st.metric("WFO Days", metrics.wfo_days)
+    with metrics_col3:
+        st.metric("WFH Days", metrics.wfh_days)
+    with metrics_col4:
+        st.metric("Sick Leaves", metrics.sick_leaves)
+    with metrics_col5:
+        st.metric("Earned Leaves", metrics.earned_leaves)
+    hours_col1, hours_col2 = st.columns(2)
+    with hours_col1:
+        st.metric("Total Hours Worked", f"{metrics.total_hours:.1f}")
+    with hours_col2:
+        st.metric("Average Hours per Day", f"{metrics.avg_hours_per_day:.2f}")
+
+    # Edit Job Descriptions
+    st.header("Edit Daily Job Descriptions")
+    st.write("Tick the projects worked on each day:")
+    projects_edited = st.session_state.timesheet_projects
+    st.data_editor(
+        st.session_state.project_grid,
+        key="day_editor",
+        hide_index=True,
+        disabled=["Date", "Location"],
+        column_config={column: st.column_config.CheckboxColumn(column) for column in project_columns(projects_edited)},
+        # Only the changed cells come back; they are patched into timesheet_df without copying it
+        on_change=lambda: apply_day_edits(
+            st.session_state.timesheet_df, st.session_state.project_grid, projects_edited,
+            st.session_state.day_editor["edited_rows"], st.session_state.applied_day_edits
         )
-        
-        # Display Timesheet with enhanced styling
-        st.write("### Final Timesheet")
-        st.write("**Legend:** 🟠 Holidays | 🟡 Weekends | 🟢 Leaves | 🔵 Work From Home | ⚪ Work From Office")
-        styled_df = style_dataframe(edited_df)
-        st.dataframe(styled_df, use_container_width=True)
-
-        st.download_button(
-            label="Download PDF",
-            data=pdf_data,
-            file_name=f"{st.session_state.employee_data['id']}_{st.session_state.employee_data['name'].replace(' ', '')}_{calendar.month_name[month].lower()}-{2025}.pdf",
-            mime="application/pdf"
+    )
+    
+    # Every edit changes the table and the PDF, so the output shares the editor's fragment
+    timesheet_output(month, year, metrics)
+
+@st.fragment(run_every=PDF_POLL_SECONDS)
+def pdf_job_progress(job_id):
+    status = job_status(job_id)
+    if status is None or status.state not in ("queued", "running"):
+        # Finished: redraw the output around the result
+        st.rerun()
+    fraction = status.done / status.total if status.total else 0.0
+    st.progress(fraction, text="Waiting for a PDF worker..." if status.state == "queued" else f"Building PDF... {fraction:.0%}")
+    st.button("Cancel", key="cancel_pdf", on_click=cancel_pdf_preview, args=(job_id,))
+
+def cancel_pdf_preview(job_id):
+    cancel_job(job_id)
+    st.session_state.pdf_preview = False
+
+def timesheet_output(month, year, metrics):
+    edited_df = st.session_state.timesheet_df
+    
+    # The PDF is only built when it is previewed or downloaded; either way it lands in the PDF cache
+    optimize_size = st.session_state.get("pdf_optimize", False)
+    # Edits rerun only this fragment, not the upload panel; keep the session's uploads from expiring meanwhile
+    session_id = current_session_id()
+    touch_session(session_id)
+    def build_pdf(employee_data=st.session_state.employee_data, signature=st.session_state.signature_digest,
+                  screenshots=tuple(st.session_state.screenshots)):
+        touch_session(session_id)
+        try:
+            return job_result(timesheet_pdf_job(edited_df, employee_data, (month, year), signature, screenshots, optimize_size))
+        except KeyError:
+            # The cached PDF was evicted between the lookup and the read: render it again
+            return job_result(timesheet_pdf_job(edited_df, employee_data, (month, year), signature, screenshots, optimize_size))
+    
+    # Display Timesheet with enhanced styling
+    st.write("### Final Timesheet")
+    st.write("**Legend:** 🟠 Holidays | 🟡 Weekends | 🟢 Leaves | 🔵 Work From Home | ⚪ Work From Office")
+    styled_df = style_dataframe(edited_df)
+    st.dataframe(styled_df, use_container_width=True)
+
+    st.checkbox("Compress PDF for email", value=False, key="pdf_optimize",
+                help="Downsamples the signature and screenshots and stores photos as JPEG")
+    # A callable is run by the server when the button is clicked, not on every rerun
+    st.download_button(
+        label="Download PDF",
+        data=build_pdf,
+        file_name=pdf_file_name(st.session_state.employee_data, month, year),
+        mime="application/pdf",
+        on_click="ignore"
+    )
+    if st.toggle("Preview PDF", key="pdf_preview"):
+        job_id = timesheet_pdf_job(edited_df, st.session_state.employee_data, (month, year),
+                                   st.session_state.signature_digest, st.session_state.screenshots, optimize_size)
+        # An edit made while the previous preview was building makes that render useless
+        if st.session_state.pdf_job not in (None, job_id):
+            cancel_job(st.session_state.pdf_job)
+        st.session_state.pdf_job = job_id
+        status = job_status(job_id)
+        if status is None:
+            # Its cached PDF was evicted since the lookup: forget the id and submit the render again
+            st.session_state.pdf_job = None
+            job_id = timesheet_pdf_job(edited_df, st.session_state.employee_data, (month, year),
+                                       st.session_state.signature_digest, st.session_state.screenshots, optimize_size)
+            st.session_state.pdf_job = job_id
+            status = job_status(job_id)
+        if status is None:
+            # Evicted again already; the progress fragment reruns the page
+            pdf_job_progress(job_id)
+        elif status.state == "done":
+            pdf_data = job_result(job_id)
+            st.caption(pdf_size_caption(pdf_data))
+            display_pdf(pdf_data)
+        elif status.state == "failed":
+            st.error(f"Could not build the PDF: {status.error}")
+        elif status.state == "cancelled":
+            st.info("PDF build cancelled.")
+        else:
+            pdf_job_progress(job_id)
+    
+    # Email Button
+    if st.button("Generate Mail Template for Outlook", key="generate_mail"):
+        outlook_url = save_and_open_email(
+            "nikhil.m@in.abb.com",
+            (month, year),
+            st.session_state.employee_data,
+            edited_df,
+            has_screenshots=bool(st.session_state.screenshots),
+            metrics=metrics
         )
-        
-        # Email Button
-        if st.button("Generate Mail Template for Outlook", key="generate_mail"):
-            outlook_url = save_and_open_email(
-                "nikhil.m@in.abb.com",
-                (month, 2025),
-                st.session_state.employee_data,
-                edited_df,
-                has_screenshots=bool(st.session_state.screenshots)
-            )
-            st.markdown(f'<a href="{outlook_url}" target="_blank">Click to Open Outlook</a>', unsafe_allow_html=True)
-            st.info("After Outlook opens, please manually attach the downloaded PDF.")
+        st.markdown(f'<a href="{outlook_url}" target="_blank">Click to Open Outlook</a>', unsafe_allow_html=True)
+        st.info("After Outlook opens, please manually attach the downloaded PDF.")
+
+def main():
+    st.set_page_config(
+        page_title="Aideas Timesheet",
+        page_icon=favicon("aideas_logo.png")
+    )
+    
+    st.title("Aideas Timesheet Generator")
+    
+    # Initialize session state
+    if 'timesheet_generated' not in st.session_state:
+        st.session_state.timesheet_generated = False
+    if 'timesheet_df' not in st.session_state:
+        st.session_state.timesheet_df = None
+    if 'screenshots' not in st.session_state:
+        st.session_state.screenshots = []
+    if 'screenshot_cache' not in st.session_state:
+        st.session_state.screenshot_cache = {}
+    if 'signature_cache' not in st.session_state:
+        st.session_state.signature_cache = {}
+    if 'signature_digest' not in st.session_state:
+        st.session_state.signature_digest = None
+    if 'pdf_job' not in st.session_state:
+        st.session_state.pdf_job = None
+    
+    employee_panel()
+    upload_panel()
+    selection_panel()
+    timesheet_panel()
 
 if __name__ == "__main__":
     main()
@@ -1,13 +1,18 @@
-import json
 import streamlit as st
-from pathlib import Path
-import hashlib
+import csv
+import io
 import pandas as pd
 from datetime import datetime, timedelta
 import re
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.utils import formatdate
+from storage import get_storage
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from blob_store import release_session
+import passwords
+from passwords import PasswordServiceBusy, verify_password
+from screenshots import favicon
 
 def init_auth():
     # Initialize session states
@@ -19,86 +24,93 @@ def init_auth():
         st.session_state.is_admin = False
     if 'show_forgot_password' not in st.session_state:
         st.session_state.show_forgot_password = False
-    if 'password_reset_requests' not in st.session_state:
-        st.session_state.password_reset_requests = {}
     
     # Set page config with logo
     st.set_page_config(
         page_title="Aideas Timesheet",
-        page_icon="aideas_logo.png"
+        page_icon=favicon("aideas_logo.png")
     )
 
 def load_registration_requests():
-    requests_file = Path("registration_requests.json")
-    if not requests_file.exists():
-        requests_file.write_text(json.dumps({}))
-    return json.loads(requests_file.read_text())
+    return get_store().load_registration_requests()
 
 def save_registration_requests(requests):
-    with Path("registration_requests.json").open("w") as f:
-        json.dump(requests, f, indent=4)
+    get_store().save_registration_requests(requests)
+
+# Unanswered password reset requests are dropped after this long
+PASSWORD_RESET_TTL = timedelta(hours=24)
 
 def validate_email(email):
     pattern = r'^[\w\.-]+@[\w\.-]+\.\w+$'
     return re.match(pattern, email) is not None
 
 def load_notifications():
-    notifications_file = Path("notifications.json")
-    if not notifications_file.exists():
-        notifications_file.write_text(json.dumps({}))
-    return json.loads(notifications_file.read_text())
+    return get_store().load_notifications()
 
 def save_notifications(notifications):
-    with open("notifications.json", "w") as f:
-        json.dump(notifications, f, indent=4)
+    get_store().save_notifications(notifications)
 
 def add_notification(username, message, notification_type="info"):
-    notifications = load_notifications()
-    if username not in notifications:
-        notifications[username] = []
-    
-    notifications[username].append({
+    get_store().add_notification(username, {
         "message": message,
         "type": notification_type,
         "timestamp": datetime.now().isoformat(),
-        "read": False,
-        "id": len(notifications[username])
+        "read": False
+    })
+
+def broadcast_notification(usernames, message, notification_type="info"):
+    # Stored once for every recipient instead of once per user
+    return get_store().broadcast_notification(usernames, {
+        "message": message,
+        "type": notification_type,
+        "timestamp": datetime.now().isoformat(),
+        "read": False
     })
-    
-    save_notifications(notifications)
 
 def delete_notification(username, notification_id):
-    notifications = load_notifications()
-    if username in notifications:
-        notifications[username] = [n for n in notifications[username] if n["id"] != notification_id]
-        save_notifications(notifications)
+    get_store().delete_notification(username, notification_id)
 
 def mark_notification_as_read(username, notification_id):
-    notifications = load_notifications()
-    if username in notifications:
-        for notification in notifications[username]:
-            if notification["id"] == notification_id:
-                notification["read"] = True
-        save_notifications(notifications)
+    get_store().mark_notification_read(username, notification_id)
+
+NOTIFICATIONS_PAGE_SIZE = 10
+USERS_PAGE_SIZE = 25
+# How many matches the search-as-you-type user pickers offer
+SELECTOR_MATCHES = 20
+IMPORT_COLUMNS = ("employee_id", "name", "email", "password")
+IMPORT_BATCH_SIZE = 200
+EXPORT_PAGE_SIZE = 500
 
 def show_notifications():
     if not st.session_state.current_user:
         return
     
-    notifications = load_notifications()
-    user_notifications = notifications.get(st.session_state.current_user, [])
+    with st.sidebar:
+        notifications_panel()
+
+@st.fragment
+def notifications_panel():
+    # Read, delete and paging clicks rerun only this panel; their callbacks run before it redraws
+    store = get_store()
+    total = store.count_notifications(st.session_state.current_user)
     
-    if not user_notifications:
-        st.sidebar.info("No notifications")
+    if not total:
+        st.info("No notifications")
         return
     
-    st.sidebar.markdown("---")
-    st.sidebar.subheader("Notifications")
+    st.markdown("---")
+    unread = store.unread_count(st.session_state.current_user)
+    st.subheader(f"Notifications ({unread} unread)" if unread else "Notifications")
     
-    user_notifications.sort(key=lambda x: x["timestamp"], reverse=True)
+    # Newest first, one page at a time
+    last_page = (total - 1) // NOTIFICATIONS_PAGE_SIZE
+    page = min(st.session_state.get('notifications_page', 0), last_page)
+    user_notifications = store.user_notifications(
+        st.session_state.current_user, page * NOTIFICATIONS_PAGE_SIZE, NOTIFICATIONS_PAGE_SIZE
+    )
     
     for notification in user_notifications:
-        with st.sidebar.expander(
+        with st.expander(
             f"{'🔵 ' if not notification['read'] else '⚪ '}{notification['message'][:30]}...",
             expanded=not notification['read']
         ):
@@ -109,34 +121,55 @@ def show_notifications():
             col1, col2 = st.columns(2)
             with col1:
                 if not notification["read"]:
-                    if st.button("Mark as Read", key=f"read_{notification['id']}"):
-                        mark_notification_as_read(st.session_state.current_user, notification["id"])
-                        st.rerun()
+                    st.button("Mark as Read", key=f"read_{notification['id']}", on_click=mark_notification_as_read,
+                              args=(st.session_state.current_user, notification["id"]))
             with col2:
-                if st.button("Delete", key=f"delete_{notification['id']}"):
-                    delete_notification(st.session_state.current_user, notification["id"])
-                    st.rerun()
+                st.button("Delete", key=f"delete_{notification['id']}", on_click=delete_notification,
+                          args=(st.session_state.current_user, notification["id"]))
+    
+    if last_page:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            st.button("◀", key="notifications_newer", disabled=page == 0,
+                      on_click=st.session_state.__setitem__, args=("notifications_page", page - 1))
+        with col2:
+            st.caption(f"Page {page + 1} of {last_page + 1}")
+        with col3:
+            st.button("▶", key="notifications_older", disabled=page == last_page,
+                      on_click=st.session_state.__setitem__, args=("notifications_page", page + 1))
 
 def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    # Salted scrypt, computed on the password service's worker pool
+    return passwords.hash_password(password)
 
-def load_users():
-    users_file = Path("users.json")
-    if not users_file.exists():
-        default_admin = {
-            "100269": {
-                "password": hash_password("Breakin@143"),
+_default_admin_checked = False
+
+def get_store():
+    # Seed the default admin the first time the process touches an empty user store
+    global _default_admin_checked
+    store = get_storage()
+    if not _default_admin_checked:
+        if store.count_users() == 0:
+            try:
+                password_hash = hash_password("Breakin@143")
+            except PasswordServiceBusy as e:
+                # Left unchecked, so the next page run seeds it
+                st.error(str(e))
+                st.stop()
+            store.put_user("100269", {
+                "password": password_hash,
                 "is_admin": True,
                 "name": "Admin",
                 "email": "admin@example.com"
-            }
-        }
-        users_file.write_text(json.dumps(default_admin, indent=4))
-    return json.loads(users_file.read_text())
+            })
+        _default_admin_checked = True
+    return store
+
+def load_users():
+    return get_store().load_users()
 
 def save_users(users):
-    with open("users.json", "w") as f:
-        json.dump(users, f, indent=4)
+    get_store().save_users(users)
 
 def register_page():
     st.title("New User Registration")
@@ -165,93 +198,111 @@ def register_page():
             st.error("Passwords do not match")
             return
             
-        requests = load_registration_requests()
-        users = load_users()
+        store = get_store()
+        existing_request = store.get_registration_request(employee_id)
         
         # Check if there's a pending request
-        if employee_id in requests and requests[employee_id]["status"] == "pending":
+        if existing_request and existing_request["status"] == "pending":
             st.error("A registration request for this Employee ID is already pending")
             return
-            
-        # If request was rejected or the user was deleted, allow new registration
-        if employee_id in requests and requests[employee_id]["status"] == "rejected":
-            del requests[employee_id]
         
-        if employee_id in users:
+        # A rejected request, or one left behind by a deleted user, is simply replaced below
+        if store.get_user(employee_id) is not None:
             st.error("An account with this Employee ID already exists")
             return
+        
+        try:
+            password_hash = hash_password(password)
+        except PasswordServiceBusy as e:
+            st.error(str(e))
+            return
             
-        requests[employee_id] = {
+        store.put_registration_request(employee_id, {
             "name": name,
             "email": email,
-            "password": hash_password(password),
+            "password": password_hash,
             "timestamp": datetime.now().isoformat(),
             "status": "pending"
-        }
-        
-        save_registration_requests(requests)
+        })
         st.success("Registration request submitted successfully! Please wait for admin approval.")
 
 def cleanup_registration_requests():
-    requests = load_registration_requests()
-    users = load_users()
-    
-    # Remove registration requests for existing users
-    for emp_id in list(requests.keys()):
-        if emp_id in users or requests[emp_id]["status"] == "rejected":
-            del requests[emp_id]
-    
-    save_registration_requests(requests)
+    # Remove rejected requests and requests for existing users
+    get_store().process_registration_requests({}, [])
+
+def process_registration_requests(approve_ids, reject_ids):
+    # Approve and reject in one batch; processed requests are removed rather than kept with a status
+    store = get_store()
+    requests = store.load_registration_requests()
+    approved_users = {
+        emp_id: {
+            "password": requests[emp_id]["password"],
+            "is_admin": False,
+            "name": requests[emp_id]["name"],
+            "email": requests[emp_id]["email"]
+        }
+        for emp_id in approve_ids if emp_id in requests and store.get_user(emp_id) is None
+    }
+    with store.transaction():
+        store.process_registration_requests(approved_users, reject_ids, {
+            "message": "Your registration request has been approved. You can now log in.",
+            "type": "success",
+            "timestamp": datetime.now().isoformat(),
+            "read": False
+        })
+    return len(approved_users), len(reject_ids)
 
 def registration_requests_tab():
     st.subheader("Registration Requests")
     
-    requests = load_registration_requests()
+    requests = {emp_id: request for emp_id, request in load_registration_requests().items()
+                if request["status"] == "pending"}
     
     if not requests:
         st.info("No pending registration requests")
         return
+    
+    selected = st.multiselect(
+        "Select requests",
+        list(requests),
+        format_func=lambda emp_id: f"{requests[emp_id]['name']} ({emp_id})",
+        key="selected_registration_requests"
+    )
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        select_all = st.checkbox("Select all", key="select_all_registration_requests")
+    if select_all:
+        selected = list(requests)
+    with col2:
+        if st.button(f"Approve selected ({len(selected)})", key="approve_selected", disabled=not selected):
+            approved, _ = process_registration_requests(selected, [])
+            st.success(f"{approved} users approved")
+            st.rerun()
+    with col3:
+        if st.button(f"Reject selected ({len(selected)})", key="reject_selected", disabled=not selected):
+            _, rejected = process_registration_requests([], selected)
+            st.error(f"{rejected} requests rejected")
+            st.rerun()
         
     for emp_id, request in requests.items():
-        if request["status"] == "pending":
-            with st.expander(f"Request from {request['name']} ({emp_id})"):
-                st.write(f"Name: {request['name']}")
-                st.write(f"Email: {request['email']}")
-                st.write(f"Requested on: {datetime.fromisoformat(request['timestamp']).strftime('%Y-%m-%d %H:%M')}")
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    if st.button("Approve", key=f"approve_{emp_id}"):
-                        users = load_users()
-                        
-                        users[emp_id] = {
-                            "password": request["password"],
-                            "is_admin": False,
-                            "name": request["name"],
-                            "email": request["email"]
-                        }
-                        
-                        save_users(users)
-                        
-                        requests[emp_id]["status"] = "approved"
-                        save_registration_requests(requests)
-                        
-                        add_notification(
-                            emp_id,
-                            "Your registration request has been approved. You can now log in.",
-                            "success"
-                        )
-                        
-                        st.success("User approved successfully")
-                        st.rerun()
-                
-                with col2:
-                    if st.button("Reject", key=f"reject_{emp_id}"):
-                        requests[emp_id]["status"] = "rejected"
-                        save_registration_requests(requests)
-                        st.error("Request rejected")
-                        st.rerun()
+        with st.expander(f"Request from {request['name']} ({emp_id})"):
+            st.write(f"Name: {request['name']}")
+            st.write(f"Email: {request['email']}")
+            st.write(f"Requested on: {datetime.fromisoformat(request['timestamp']).strftime('%Y-%m-%d %H:%M')}")
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                if st.button("Approve", key=f"approve_{emp_id}"):
+                    process_registration_requests([emp_id], [])
+                    st.success("User approved successfully")
+                    st.rerun()
+            
+            with col2:
+                if st.button("Reject", key=f"reject_{emp_id}"):
+                    process_registration_requests([], [emp_id])
+                    st.error("Request rejected")
+                    st.rerun()
 
 def login():
     login_tab, register_tab = st.tabs(["Login", "Register"])
@@ -272,11 +323,20 @@ def login():
         col1, col2 = st.columns(2)
         with col1:
             if st.button("Login"):
-                users = load_users()
-                if username in users and users[username]["password"] == hash_password(password):
+                store = get_store()
+                user = store.get_user(username)
+                try:
+                    valid, rehashed = verify_password(password, user["password"] if user is not None else None)
+                except PasswordServiceBusy as e:
+                    st.error(str(e))
+                    return
+                if valid:
+                    if rehashed:
+                        # Upgrade a legacy SHA-256 (or older-cost) hash now that we know the password
+                        store.update_user(username, password=rehashed)
                     st.session_state.authenticated = True
                     st.session_state.current_user = username
-                    st.session_state.is_admin = users[username].get("is_admin", False)
+                    st.session_state.is_admin = user.get("is_admin", False)
                     st.rerun()
                 else:
                     st.error("Invalid username or password")
@@ -290,8 +350,11 @@ def login():
         register_page()
 
 def admin_panel():
-    create_tab, view_tab, password_tab, reset_requests_tab, registration_tab = st.tabs([
-        "Create User", "View Users", "Password Management", "Reset Requests", "Registration Requests"
+    pending_resets = get_store().count_password_reset_requests(datetime.now().isoformat())
+    create_tab, view_tab, password_tab, reset_requests_tab, registration_tab, broadcast_tab = st.tabs([
+        "Create User", "View Users", "Password Management",
+        f"Reset Requests ({pending_resets})" if pending_resets else "Reset Requests",
+        "Registration Requests", "Broadcast"
     ])
     
     with create_tab:
@@ -304,117 +367,157 @@ def admin_panel():
         is_admin = st.checkbox("Admin Access", key="create_admin_access")
         
         if st.button("Create User"):
-            users = load_users()
-            if new_username in users:
+            store = get_store()
+            if store.get_user(new_username) is not None:
                 st.error("Employee ID already exists")
             elif not all([new_username, new_name, new_email, new_password]):
                 st.error("All fields are required")
             elif not validate_email(new_email):
                 st.error("Please enter a valid email address")
             else:
-                users[new_username] = {
-                    "password": hash_password(new_password),
-                    "is_admin": is_admin,
-                    "name": new_name,
-                    "email": new_email
-                }
-                save_users(users)
-                st.success("User created successfully")
+                try:
+                    password_hash = hash_password(new_password)
+                except PasswordServiceBusy as e:
+                    st.error(str(e))
+                else:
+                    store.put_user(new_username, {
+                        "password": password_hash,
+                        "is_admin": is_admin,
+                        "name": new_name,
+                        "email": new_email
+                    })
+                    st.success("User created successfully")
+        
+        st.subheader("Bulk Import")
+        st.caption("CSV with columns employee_id, name, email, password and optionally is_admin (yes/no)")
+        import_file = st.file_uploader("Users CSV", type="csv", key="import_users_file")
+        if st.button("Import Users", disabled=import_file is None):
+            progress = st.empty()
+            imported, errors = import_users_csv(
+                import_file, on_batch=lambda rows, imported: progress.caption(f"{rows} rows read, {imported} imported")
+            )
+            st.success(f"Imported {imported} users")
+            if errors:
+                st.error(f"{len(errors)} rows were skipped")
+                report = pd.DataFrame(errors, columns=["Line", "Employee ID", "Error"])
+                st.dataframe(report, hide_index=True)
+                st.download_button("Download error report", report.to_csv(index=False),
+                                   file_name="user_import_errors.csv", mime="text/csv")
+        
+        st.subheader("Export")
+        # Built only when clicked, on a separate thread, without rerunning the page
+        st.download_button("Export users as CSV", export_users_csv, file_name="users.csv",
+                           mime="text/csv", on_click="ignore")
 
     with view_tab:
         st.subheader("User List")
-        users = load_users()
+        store = get_store()
         
-        user_list = []
-        for username, details in users.items():
-            user_list.append({
-                'Employee ID': username,
-                'Name': details.get('name', 'N/A'),
-                'Email': details.get('email', 'N/A'),
-                'Role': 'Admin' if details.get('is_admin', False) else 'User'
-            })
+        query = st.text_input("Search users", key="user_directory_search", placeholder="Employee ID, name or email")
+        page = st.session_state.get('user_directory_page', 0)
+        rows, matches = store.search_users(query, page * USERS_PAGE_SIZE, USERS_PAGE_SIZE)
+        last_page = max(matches - 1, 0) // USERS_PAGE_SIZE
+        if page > last_page:
+            page = st.session_state.user_directory_page = last_page
+            rows, matches = store.search_users(query, page * USERS_PAGE_SIZE, USERS_PAGE_SIZE)
         
-        df = pd.DataFrame(user_list)
+        df = pd.DataFrame(
+            [(username, details.get('name', 'N/A'), details.get('email', 'N/A'),
+              'Admin' if details.get('is_admin', False) else 'User') for username, details in rows],
+            columns=['Employee ID', 'Name', 'Email', 'Role']
+        )
         st.dataframe(df, hide_index=True)
         
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("◀ Previous", key="user_directory_prev", disabled=page == 0):
+                st.session_state.user_directory_page = page - 1
+                st.rerun()
+        with col2:
+            st.caption(f"{matches} users · page {page + 1} of {last_page + 1}")
+        with col3:
+            if st.button("Next ▶", key="user_directory_next", disabled=page == last_page):
+                st.session_state.user_directory_page = page + 1
+                st.rerun()
+        
+        total_users, admin_users = store.role_counts()
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total Users", len(user_list))
+            st.metric("Total Users", total_users)
         with col2:
-            st.metric("Admin Users", len([u for u in user_list if u['Role'] == 'Admin']))
+            st.metric("Admin Users", admin_users)
         with col3:
-            st.metric("Regular Users", len([u for u in user_list if u['Role'] == 'User']))
+            st.metric("Regular Users", total_users - admin_users)
         
         st.subheader("Delete User")
-        user_to_delete = st.selectbox("Select user to delete", 
-                                    [u['Employee ID'] for u in user_list if u['Employee ID'] != st.session_state.current_user],
-                                    key="delete_user")
+        user_to_delete = user_selector("Select user to delete", key="delete_user",
+                                       exclude=st.session_state.current_user)
         if st.button("Delete User"):
-            if user_to_delete in users:
-                # Delete user from users.json
-                del users[user_to_delete]
-                save_users(users)
-                
-                # Also clean up any pending registration requests for this user
-                requests = load_registration_requests()
-                if user_to_delete in requests:
-                    del requests[user_to_delete]
-                    save_registration_requests(requests)
+            if user_to_delete and store.get_user(user_to_delete) is not None:
+                with store.transaction():
+                    store.delete_user(user_to_delete)
+                    # Also clean up any pending registration requests for this user
+                    store.delete_registration_request(user_to_delete)
                 
                 st.success(f"User {user_to_delete} deleted successfully")
                 st.rerun()
 
     with password_tab:
         st.subheader("Change User Password")
-        users = load_users()
         
-        user_to_change = st.selectbox("Select user", 
-                                    list(users.keys()),
-                                    key="change_password_user")
+        user_to_change = user_selector("Select user", key="change_password_user")
         
         new_password = st.text_input("New Password", type="password", key="new_password")
         confirm_password = st.text_input("Confirm New Password", type="password", key="confirm_password")
         
         if st.button("Change Password"):
-            if not new_password or not confirm_password:
+            if not user_to_change:
+                st.error("Please select a user")
+            elif not new_password or not confirm_password:
                 st.error("Please enter and confirm the new password")
             elif new_password != confirm_password:
                 st.error("Passwords do not match")
             else:
-                users[user_to_change]["password"] = hash_password(new_password)
-                save_users(users)
-                st.success(f"Password changed successfully for user {user_to_change}")
+                try:
+                    password_hash = hash_password(new_password)
+                except PasswordServiceBusy as e:
+                    st.error(str(e))
+                else:
+                    get_store().update_user(user_to_change, password=password_hash)
+                    st.success(f"Password changed successfully for user {user_to_change}")
 
     with reset_requests_tab:
         st.subheader("Password Reset Requests")
         
         current_time = datetime.now()
-        for username, request_data in list(st.session_state.password_reset_requests.items()):
-            request_time = datetime.fromisoformat(request_data["timestamp"])
-            if current_time - request_time > timedelta(hours=24):
-                del st.session_state.password_reset_requests[username]
+        reset_requests = get_store().pending_password_reset_requests(current_time.isoformat())
         
-        if not st.session_state.password_reset_requests:
+        if not reset_requests:
             st.info("No pending password reset requests")
         else:
-            for username, request_data in st.session_state.password_reset_requests.items():
-                if request_data["status"] == "pending":
-                    st.warning(f"Reset request from user: {username}")
-                    request_time = datetime.fromisoformat(request_data["timestamp"])
-                    time_ago = current_time - request_time
-                    st.text(f"Requested {int(time_ago.total_seconds() / 60)} minutes ago")
-                    
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        new_pass = st.text_input(f"New password for {username}", type="password", key=f"reset_{username}")
-                        if st.button("Reset Password", key=f"reset_btn_{username}"):
-                            if not new_pass:
-                                st.error("Please enter a new password")
+            for username, request_data in reset_requests:
+                st.warning(f"Reset request from user: {username}")
+                request_time = datetime.fromisoformat(request_data["timestamp"])
+                time_ago = current_time - request_time
+                st.text(f"Requested {int(time_ago.total_seconds() / 60)} minutes ago")
+                
+                col1, col2 = st.columns(2)
+                with col1:
+                    new_pass = st.text_input(f"New password for {username}", type="password", key=f"reset_{username}")
+                    if st.button("Reset Password", key=f"reset_btn_{username}"):
+                        if not new_pass:
+                            st.error("Please enter a new password")
+                        else:
+                            # Hashed before the transaction, so the write lock is not held through the KDF
+                            try:
+                                password_hash = hash_password(new_pass)
+                            except PasswordServiceBusy as e:
+                                st.error(str(e))
                             else:
-                                users = load_users()
-                                users[username]["password"] = hash_password(new_pass)
-                                save_users(users)
-                                st.session_state.password_reset_requests[username]["status"] = "completed"
+                                store = get_store()
+                                with store.transaction():
+                                    store.update_user(username, password=password_hash)
+                                    store.delete_password_reset_request(username)
                                 
                                 add_notification(
                                     username,
@@ -424,20 +527,144 @@ def admin_panel():
                                 
                                 st.success(f"Password reset for {username}")
                                 st.rerun()
-                    with col2:
-                        if st.button("Dismiss Request", key=f"dismiss_{username}"):
-                            del st.session_state.password_reset_requests[username]
-                            add_notification(
-                                username,
-                                "Your password reset request has been dismissed by the admin. Please submit a new request if needed.",
-                                "info"
-                            )
-                            st.rerun()
-                    st.markdown("---")
+                with col2:
+                    if st.button("Dismiss Request", key=f"dismiss_{username}"):
+                        get_store().delete_password_reset_request(username)
+                        add_notification(
+                            username,
+                            "Your password reset request has been dismissed by the admin. Please submit a new request if needed.",
+                            "info"
+                        )
+                        st.rerun()
+                st.markdown("---")
 
     with registration_tab:
         registration_requests_tab()
 
+    with broadcast_tab:
+        broadcast_tab_contents()
+
+def import_users_csv(csv_file, batch_size=IMPORT_BATCH_SIZE, on_batch=None):
+    """Stream rows from a users CSV, hashing passwords in a worker pool and writing a batch at a time.
+    
+    Returns the number of users imported and a list of (line, employee id, error) for skipped rows.
+    """
+    csv_file.seek(0)
+    text = io.TextIOWrapper(csv_file, encoding="utf-8-sig", newline="")
+    try:
+        return _import_users(csv.DictReader(text), batch_size, on_batch)
+    finally:
+        # Leave the upload open for Streamlit
+        text.detach()
+
+def _import_users(reader, batch_size, on_batch):
+    store = get_store()
+    missing_columns = [column for column in IMPORT_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing_columns:
+        return 0, [(1, "", f"Missing columns: {', '.join(missing_columns)}")]
+    
+    imported, errors, seen, batch = 0, [], set(), []
+    
+    def flush():
+        hashes = passwords.hash_passwords([row["password"] for row in batch])
+        with store.transaction():
+            store.put_users({
+                row["employee_id"]: {
+                    "password": password,
+                    "is_admin": row.get("is_admin", "").strip().lower() in ("1", "true", "yes", "y", "admin"),
+                    "name": row["name"],
+                    "email": row["email"]
+                }
+                for row, password in zip(batch, hashes)
+            })
+        batch.clear()
+    
+    # Line 1 is the header
+    for line, row in enumerate(reader, start=2):
+        row = {column: (value or "").strip() for column, value in row.items() if column}
+        emp_id = row.get("employee_id", "")
+        empty = [column for column in IMPORT_COLUMNS if not row.get(column)]
+        if empty:
+            errors.append((line, emp_id, f"Missing {', '.join(empty)}"))
+        elif not validate_email(row["email"]):
+            errors.append((line, emp_id, "Invalid email address"))
+        elif emp_id in seen:
+            errors.append((line, emp_id, "Duplicate Employee ID in file"))
+        elif store.get_user(emp_id) is not None:
+            errors.append((line, emp_id, "Employee ID already exists"))
+        else:
+            seen.add(emp_id)
+            batch.append(row)
+            if len(batch) >= batch_size:
+                imported += len(batch)
+                flush()
+                if on_batch:
+                    on_batch(line - 1, imported)
+    if batch:
+        imported += len(batch)
+        flush()
+    return imported, errors
+
+def write_users_csv(out):
+    # A page of users at a time, so the table is never held in memory
+    writer = csv.writer(out)
+    writer.writerow(["employee_id", "name", "email", "role"])
+    store = get_store()
+    offset = 0
+    while True:
+        rows, _ = store.search_users("", offset, EXPORT_PAGE_SIZE)
+        writer.writerows(
+            (emp_id, user.get("name", ""), user.get("email", ""), "admin" if user.get("is_admin", False) else "user")
+            for emp_id, user in rows
+        )
+        if len(rows) < EXPORT_PAGE_SIZE:
+            return
+        offset += EXPORT_PAGE_SIZE
+
+def export_users_csv():
+    # The CSV ends up in memory for the download anyway, so it is encoded straight into a buffer
+    buffer = io.BytesIO()
+    with io.TextIOWrapper(buffer, encoding="utf-8", newline="", write_through=True) as f:
+        write_users_csv(f)
+        return buffer.getvalue()
+
+def user_selector(label, key, exclude=None):
+    # Search as you type; only the first matches are sent to the browser instead of every employee ID
+    query = st.text_input(f"Search: {label}", key=f"{key}_search", placeholder="Employee ID, name or email")
+    matches, total = get_store().search_users(query, 0, SELECTOR_MATCHES + 1)
+    names = {emp_id: user.get("name", "") for emp_id, user in matches if emp_id != exclude}
+    options = list(names)[:SELECTOR_MATCHES]
+    if total > len(options):
+        st.caption(f"Showing {len(options)} of {total} matches, type to narrow down")
+    return st.selectbox(label, options, format_func=lambda emp_id: f"{emp_id} - {names[emp_id]}", key=key)
+
+def broadcast_tab_contents():
+    st.subheader("Broadcast Notification")
+    
+    message = st.text_area("Message", key="broadcast_message")
+    notification_type = st.selectbox("Type", ["info", "success", "warning"], key="broadcast_type")
+    audience = st.radio("Send to", ["All users", "Admins only", "Selected employees"], key="broadcast_audience")
+    
+    if audience == "All users":
+        recipients = list(load_users())
+    elif audience == "Admins only":
+        recipients = [emp_id for emp_id, user in load_users().items() if user.get("is_admin", False)]
+    else:
+        query = st.text_input("Search employees", key="broadcast_search", placeholder="Employee ID, name or email")
+        matches, _ = get_store().search_users(query, 0, SELECTOR_MATCHES)
+        # Keep earlier picks selectable while searching for more
+        options = list(dict.fromkeys([*st.session_state.get("broadcast_recipients", []), *(emp_id for emp_id, _ in matches)]))
+        recipients = st.multiselect("Employee IDs", options, key="broadcast_recipients")
+    
+    if st.button("Send Broadcast"):
+        if not message.strip():
+            st.error("Please enter a message")
+        elif not recipients:
+            st.error("No recipients selected")
+        else:
+            broadcast_notification(recipients, message.strip(), notification_type)
+            st.success(f"Notification sent to {len(recipients)} users")
+
 def show_password_reset_form(location="sidebar"):
     """Show password reset form either in sidebar or main area"""
     container = st.sidebar if location == "sidebar" else st
@@ -450,10 +677,15 @@ def show_password_reset_form(location="sidebar"):
     confirm_pass = container.text_input("Confirm New Password", type="password", key=f"confirm_pass_{location}")
     
     if container.button("Reset Password", key=f"reset_btn_{location}"):
-        users = load_users()
+        store = get_store()
         current_user = st.session_state.current_user
         
-        if not old_pass or hash_password(old_pass) != users[current_user]["password"]:
+        try:
+            valid = bool(old_pass) and verify_password(old_pass, store.get_user(current_user)["password"])[0]
+        except PasswordServiceBusy as e:
+            container.error(str(e))
+            return False
+        if not valid:
             container.error("Current password is incorrect")
             return False
         
@@ -469,8 +701,11 @@ def show_password_reset_form(location="sidebar"):
             container.error("New password must be different from current password")
             return False
         
-        users[current_user]["password"] = hash_password(new_pass)
-        save_users(users)
+        try:
+            store.update_user(current_user, password=hash_password(new_pass))
+        except PasswordServiceBusy as e:
+            container.error(str(e))
+            return False
         
         add_notification(
             current_user,
@@ -487,12 +722,13 @@ def request_password_reset():
     username = st.text_input("Enter your Employee ID")
     
     if st.button("Submit Request"):
-        users = load_users()
-        if username in users:
-            st.session_state.password_reset_requests[username] = {
-                "timestamp": datetime.now().isoformat(),
-                "status": "pending"
-            }
+        store = get_store()
+        if store.get_user(username) is not None:
+            now = datetime.now()
+            store.put_password_reset_request(username, {
+                "timestamp": now.isoformat(),
+                "expires_at": (now + PASSWORD_RESET_TTL).isoformat()
+            })
             st.success("Password reset request submitted. Please wait for admin approval.")
             st.info("You can return to login screen using the button below.")
         else:
@@ -507,6 +743,10 @@ def logout():
         st.session_state.authenticated = False
         st.session_state.current_user = None
         st.session_state.is_admin = False
+        # Unpin the session's uploads; they are processed again from the uploader after the next sign-in
+        ctx = get_script_run_ctx()
+        if ctx:
+            release_session(ctx.session_id)
         st.rerun()
 
 def auth_wrapper(main_app):
@@ -0,0 +1,136 @@
+import argparse
+import csv
+import json
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from app import DEFAULT_MANAGER, LEAVE_TYPES, create_pdf, create_timesheet, pdf_file_name
+from auth_systems import load_users
+from holiday_calendar import DEFAULT_LOCATION, in_month
+
+def split_list(value):
+    return [item.strip() for item in (value or "").split(";") if item.strip()]
+
+def load_employee_inputs(path):
+    # JSON: {"<employee id>": {"projects": [...], "leave": {"MM/DD/YYYY": "Sick Leave"}, "wfh": ["MM/DD/YYYY"]}}
+    # CSV: employee_id, projects, sick_leave, earned_leave, wfh - list cells are ';'-separated
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        return json.loads(path.read_text())
+    
+    inputs = {}
+    with path.open(newline="") as f:
+        for row in csv.DictReader(f):
+            leave = {date: "Sick Leave" for date in split_list(row.get("sick_leave"))}
+            leave.update({date: "Earned Leave" for date in split_list(row.get("earned_leave"))})
+            inputs[row["employee_id"].strip()] = {
+                "projects": split_list(row.get("projects")),
+                "leave": leave,
+                "wfh": split_list(row.get("wfh"))
+            }
+    return inputs
+
+def render_employee(job):
+    # (employee id, output path, PDF size, error); one employee's failure does not stop the batch
+    employee_data, year, month, projects, leave_dates, wfh_dates, output_dir = job
+    try:
+        df = create_timesheet(year, month, employee_data, projects, leave_dates, wfh_dates)
+        pdf_data = create_pdf(df, employee_data, (month, year))
+        output_path = Path(output_dir) / pdf_file_name(employee_data, month, year)
+        output_path.write_bytes(pdf_data)
+    except Exception as e:
+        return employee_data["id"], None, 0, f"{type(e).__name__}: {e}"
+    return employee_data["id"], str(output_path), len(pdf_data), None
+
+def date_errors(dates, year, month):
+    errors = []
+    for date_str in dates:
+        try:
+            valid = datetime.strptime(date_str, "%m/%d/%Y").strftime("%m/%d/%Y") == date_str
+        except (TypeError, ValueError):
+            valid = False
+        if not valid:
+            errors.append(f"{date_str!r} is not a MM/DD/YYYY date")
+            continue
+        if not in_month(date_str, year, month):
+            errors.append(f"{date_str} is not in {month:02d}/{year}")
+    return errors
+
+def input_errors(employee_input, year, month):
+    leave_dates = employee_input.get("leave", {})
+    errors = [f"unknown leave type {leave_type!r} for {date_str}"
+              for date_str, leave_type in leave_dates.items() if leave_type not in LEAVE_TYPES]
+    return errors + date_errors(list(leave_dates) + list(employee_input.get("wfh", [])), year, month)
+
+def build_jobs(users, inputs, year, month, output_dir, default_projects):
+    # skipped: (employee id, reason) for employees without projects or with invalid input
+    jobs, skipped = [], []
+    for employee_id, details in users.items():
+        employee_input = inputs.get(employee_id, {})
+        projects = employee_input.get("projects") or default_projects
+        if not projects:
+            skipped.append((employee_id, "no projects given"))
+            continue
+        errors = input_errors(employee_input, year, month)
+        if errors:
+            skipped.append((employee_id, "; ".join(errors)))
+            continue
+        employee_data = {
+            "name": details.get("name", employee_id),
+            "id": employee_id,
+            "location": details.get("location", DEFAULT_LOCATION),
+            "manager": details.get("manager", DEFAULT_MANAGER)
+        }
+        jobs.append((
+            employee_data, year, month, projects,
+            employee_input.get("leave", {}), employee_input.get("wfh", []),
+            str(output_dir)
+        ))
+    return jobs, skipped
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate timesheet PDFs for every user in users.json")
+    parser.add_argument("--month", type=int, required=True)
+    parser.add_argument("--year", type=int, required=True)
+    parser.add_argument("--input", help="CSV or JSON file with per-employee projects, leave and WFH dates")
+    parser.add_argument("--output-dir", default="timesheets")
+    parser.add_argument("--default-project", action="append", default=[],
+                        help="Project used for employees without projects in --input (repeatable)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+    
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    inputs = load_employee_inputs(args.input) if args.input else {}
+    jobs, skipped = build_jobs(load_users(), inputs, args.year, args.month, output_dir, args.default_project)
+    for employee_id, reason in skipped:
+        print(f"Skipping {employee_id}: {reason}")
+    
+    start = time.perf_counter()
+    total_bytes = 0
+    failed = []
+    # Workers only receive the small per-employee inputs; frames and PDFs are built and written in the worker
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        chunksize = max(1, len(jobs) // (args.workers * 4))
+        for employee_id, output_path, size, error in executor.map(render_employee, jobs, chunksize=chunksize):
+            if error:
+                failed.append(employee_id)
+                print(f"Failed {employee_id}: {error}")
+                continue
+            total_bytes += size
+            print(f"{employee_id}: {output_path}")
+    elapsed = time.perf_counter() - start
+    
+    generated = len(jobs) - len(failed)
+    rate = generated / elapsed if elapsed else 0.0
+    print(f"Generated {generated} PDFs ({total_bytes / 1024:.0f} KB) in {elapsed:.2f}s "
+          f"with {args.workers} workers - {rate:.1f} PDFs/s")
+    if skipped or failed:
+        print(f"{len(skipped)} skipped, {len(failed)} failed")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
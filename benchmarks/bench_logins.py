@@ -0,0 +1,42 @@
+"""Logins per second against the scrypt cost: python benchmarks/bench_logins.py [--clients 8] [--logins 40]"""
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import passwords
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--costs", type=int, nargs="+", default=[2 ** 12, 2 ** 13, 2 ** 14, 2 ** 15], help="scrypt N values")
+    parser.add_argument("--clients", type=int, default=8, help="Threads logging in at once")
+    parser.add_argument("--logins", type=int, default=40, help="Logins per cost")
+    args = parser.parse_args(argv)
+    
+    for n in args.costs:
+        # Verifying at the configured cost, so no login comes back with a rehash to store
+        passwords.SCRYPT_N = n
+        stored = passwords._encode("secret", n)
+        def client(count):
+            for _ in range(count):
+                assert passwords.verify_password("secret", stored) == (True, None)
+        clients = [threading.Thread(target=client, args=(args.logins // args.clients,)) for _ in range(args.clients)]
+        logins = args.logins // args.clients * args.clients
+        start = time.perf_counter()
+        for thread in clients:
+            thread.start()
+        # How late a 1ms sleep on this thread wakes up while the pool works: the stall a page script would see
+        worst_wakeup = 0.0
+        while any(thread.is_alive() for thread in clients):
+            sleep_start = time.perf_counter()
+            time.sleep(0.001)
+            worst_wakeup = max(worst_wakeup, time.perf_counter() - sleep_start)
+        elapsed = time.perf_counter() - start
+        print(f"N=2^{n.bit_length() - 1}: {logins / elapsed:6.1f} logins/s ({elapsed / logins * 1000:.0f} ms each), "
+              f"worst 1ms-sleep wake-up {worst_wakeup * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""create_pdf renders per second: python benchmarks/bench_pdf_render.py [--cold]"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from app import DEFAULT_MANAGER, create_pdf, create_timesheet
+from holiday_calendar import DEFAULT_LOCATION
+from pdf_template import pdf_template
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--renders", type=int, default=20, help="Renders per run")
+    parser.add_argument("--cold", action="store_true",
+                        help="Rebuild the PDF template (logo, styles, row styles) for every render, as before it was shared")
+    args = parser.parse_args(argv)
+    
+    employee = {"name": "Test User", "id": "100298", "location": DEFAULT_LOCATION, "manager": DEFAULT_MANAGER}
+    df = create_timesheet(2025, 10, employee, ["Proj A", "Proj B"], {"10/06/2025": "Sick Leave"}, ["10/08/2025"])
+    size = len(create_pdf(df, employee, (10, 2025)))
+    rates = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        for _ in range(args.renders):
+            if args.cold:
+                pdf_template.cache_clear()
+            create_pdf(df, employee, (10, 2025))
+        rates.append(args.renders / (time.perf_counter() - start))
+    print(f"{'cold' if args.cold else 'shared'} template: {statistics.median(rates):.1f} renders/s median "
+          f"(runs: {' '.join(f'{rate:.1f}' for rate in rates)}), {size} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Time create_timesheet over many employee-months: python benchmarks/bench_timesheets.py [--count 1000]"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from app import DEFAULT_MANAGER, create_timesheet
+from holiday_calendar import DEFAULT_LOCATION
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1000, help="Employee-months to generate")
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs; the best is reported")
+    args = parser.parse_args(argv)
+    
+    jobs = []
+    for i in range(args.count):
+        month = i % 12 + 1
+        employee = {"name": f"Employee {i}", "id": str(100000 + i), "location": DEFAULT_LOCATION, "manager": DEFAULT_MANAGER}
+        leave = {f"{month:02d}/10/{args.year}": "Sick Leave", f"{month:02d}/17/{args.year}": "Earned Leave"}
+        jobs.append((args.year, month, employee, ["Proj A", "Proj B"], leave, [f"{month:02d}/14/{args.year}"]))
+    
+    # One warm-up month so the per-year calendar is already memoized, as it is in a running server
+    create_timesheet(*jobs[0])
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for job in jobs:
+            create_timesheet(*job)
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    print(f"{args.count} employee-months in {best:.3f}s best of {args.repeat} ({args.count / best:.0f}/s; "
+          f"runs: {' '.join(f'{t:.3f}' for t in times)})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# Content-addressed store for uploaded images, so session state only holds digests
+BLOB_DIR = Path(os.environ.get("AIDEAS_BLOB_DIR", Path(tempfile.gettempdir()) / "aideas_blobs"))
+MAX_BLOB_STORE_BYTES = 256 * 1024 * 1024
+# Streamlit has no session-end hook. A session's blobs are released when it logs out (release_session)
+# or once it has not been seen for this long; every rerun that uses its blobs marks it seen (retain_blobs,
+# touch_session), so only sessions idle this long lose them. Evicted uploads are processed again from the
+# uploader on the next rerun.
+SESSION_IDLE_SECONDS = 4 * 60 * 60
+
+_lock = threading.Lock()
+_index = None  # OrderedDict digest -> size, least recently used first
+_store_bytes = 0
+_session_refs = {}  # session id -> set of digests
+_session_seen = {}  # session id -> last time.monotonic()
+
+def _load_index():
+    global _index, _store_bytes
+    if _index is not None:
+        return
+    BLOB_DIR.mkdir(parents=True, exist_ok=True)
+    entries = sorted((path.stat().st_mtime, path.name, path.stat().st_size) for path in BLOB_DIR.glob("*.blob"))
+    _index = OrderedDict((name[:-len(".blob")], size) for _, name, size in entries)
+    _store_bytes = sum(_index.values())
+
+def blob_path(digest):
+    return BLOB_DIR / f"{digest}.blob"
+
+def _referenced():
+    return set().union(*_session_refs.values()) if _session_refs else set()
+
+def _delete(digest):
+    global _store_bytes
+    _store_bytes -= _index.pop(digest)
+    blob_path(digest).unlink(missing_ok=True)
+
+def _evict():
+    referenced = _referenced()
+    for digest in list(_index):
+        if _store_bytes <= MAX_BLOB_STORE_BYTES:
+            break
+        if digest not in referenced:
+            _delete(digest)
+
+def put_blob(data):
+    global _store_bytes
+    digest = hashlib.sha256(data).hexdigest()
+    with _lock:
+        _load_index()
+        if digest in _index:
+            _index.move_to_end(digest)
+            return digest
+        # Write to a temp file and rename so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=BLOB_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, blob_path(digest))
+        _index[digest] = len(data)
+        _store_bytes += len(data)
+        _evict()
+    return digest
+
+def open_blob(digest):
+    # Read-only memory map of the blob; it is file-like, so PIL and ReportLab can read it in place
+    # and pages are loaded on demand instead of copying the whole blob into a bytes object.
+    # Use it in a with block so the map is closed once the image is decoded.
+    with _lock:
+        _load_index()
+        if digest in _index:
+            _index.move_to_end(digest)
+    with open(blob_path(digest), "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def retain_blobs(session_id, digests):
+    # Replace the set of blobs a session refers to; blobs it dropped become evictable
+    with _lock:
+        _load_index()
+        _session_refs[session_id] = set(digests)
+        _session_seen[session_id] = time.monotonic()
+        for digest in _session_refs[session_id]:
+            if digest in _index:
+                _index.move_to_end(digest)
+        _expire_idle_sessions()
+
+def touch_session(session_id):
+    # Mark a session seen on reruns that read its blobs without changing them
+    with _lock:
+        if session_id in _session_seen:
+            _session_seen[session_id] = time.monotonic()
+
+def _release(session_id):
+    released = _session_refs.pop(session_id, set())
+    _session_seen.pop(session_id, None)
+    still_referenced = _referenced()
+    for digest in released - still_referenced:
+        if digest in _index:
+            _delete(digest)
+
+def release_session(session_id):
+    with _lock:
+        _load_index()
+        _release(session_id)
+
+def _expire_idle_sessions():
+    cutoff = time.monotonic() - SESSION_IDLE_SECONDS
+    for session_id in [s for s, seen in _session_seen.items() if seen < cutoff]:
+        _release(session_id)
@@ -0,0 +1,85 @@
+import json
+import calendar
+import warnings
+from collections import namedtuple
+from datetime import date, timedelta
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+
+# Next to this module, whatever directory the app is started from
+HOLIDAYS_FILE = Path(__file__).resolve().parent / "holidays.json"
+DEFAULT_LOCATION = "ABB Southfield"
+
+# Day types stored in the per-year calendar array
+WORKING = 0
+WEEKEND = 1
+HOLIDAY = 2
+
+# One entry per day of the year; month_starts[m - 1]:month_starts[m] slices out month m
+YearCalendar = namedtuple("YearCalendar", ["date_strs", "day_types", "holiday_names", "month_starts"])
+MonthCalendar = namedtuple("MonthCalendar", ["date_strs", "day_types", "holiday_names"])
+
+@lru_cache(maxsize=None)
+def load_holidays():
+    # {location: {year: {"MM/DD/YYYY": name}}}
+    if not HOLIDAYS_FILE.exists():
+        warnings.warn(f"{HOLIDAYS_FILE} not found; no holidays will be marked on timesheets")
+        return {}
+    data = json.loads(HOLIDAYS_FILE.read_text())
+    return {
+        location: {int(year): holidays for year, holidays in years.items()}
+        for location, years in data.items()
+    }
+
+def get_holidays(year, location=DEFAULT_LOCATION):
+    return load_holidays().get(location, {}).get(year, {})
+
+def available_years(location=DEFAULT_LOCATION):
+    return sorted(load_holidays().get(location, {}))
+
+@lru_cache(maxsize=None)
+def year_calendar(year, location=DEFAULT_LOCATION):
+    num_days = 366 if calendar.isleap(year) else 365
+    start = date(year, 1, 1)
+    days = [start + timedelta(days=i) for i in range(num_days)]
+    
+    date_strs = np.array([d.strftime("%m/%d/%Y") for d in days], dtype=object)
+    day_types = np.where(np.array([d.weekday() >= 5 for d in days]), WEEKEND, WORKING).astype(np.uint8)
+    names = np.full(num_days, None, dtype=object)
+    for date_str, name in get_holidays(year, location).items():
+        day_index = (date(year, int(date_str[:2]), int(date_str[3:5])) - start).days
+        day_types[day_index] = HOLIDAY
+        names[day_index] = name
+    
+    month_lengths = [calendar.monthrange(year, month)[1] for month in range(1, 13)]
+    month_starts = np.concatenate([[0], np.cumsum(month_lengths)])
+    
+    for array in (date_strs, day_types, names):
+        array.flags.writeable = False
+    return YearCalendar(date_strs, day_types, names, month_starts)
+
+@lru_cache(maxsize=None)
+def month_calendar(year, month, location=DEFAULT_LOCATION):
+    year_cal = year_calendar(year, location)
+    days = slice(year_cal.month_starts[month - 1], year_cal.month_starts[month])
+    return MonthCalendar(year_cal.date_strs[days], year_cal.day_types[days], year_cal.holiday_names[days])
+
+def in_month(date_str, year, month):
+    # "MM/DD/YYYY" falls in the given month
+    return date_str[:3] == f"{month:02d}/" and date_str[5:] == f"/{year}"
+
+def day_index(date_str):
+    # "MM/DD/YYYY" -> position within its month
+    return int(date_str[3:5]) - 1
+
+@lru_cache(maxsize=None)
+def working_dates(year, month, location=DEFAULT_LOCATION):
+    month_cal = month_calendar(year, month, location)
+    return tuple(month_cal.date_strs[month_cal.day_types == WORKING])
+
+@lru_cache(maxsize=None)
+def month_holidays(year, month, location=DEFAULT_LOCATION):
+    month_cal = month_calendar(year, month, location)
+    is_holiday = month_cal.day_types == HOLIDAY
+    return dict(zip(month_cal.date_strs[is_holiday], month_cal.holiday_names[is_holiday]))
@@ -0,0 +1,228 @@
+import fcntl
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+
+NOTIFICATION_LOG_FILE = Path("notifications.log")
+# Rewrite the log once this many read/delete tombstones have piled up
+COMPACT_TOMBSTONES = 500
+
+class NotificationLog:
+    """Append-only JSON-lines log of notifications with an in-memory per-user index.
+
+    An "add" record carries the message once with its list of recipients, so a broadcast is a single
+    line; "read" and "delete" records are per-user tombstones. The first line of a compacted log is
+    {"op": "seq", "id": next_id} so ids stay monotonic across compactions.
+    """
+
+    def __init__(self, path=NOTIFICATION_LOG_FILE, legacy_file=None):
+        self.path = Path(path)
+        self.legacy_file = Path(legacy_file) if legacy_file else None
+        self._lock = threading.Lock()
+        self._compacting = False
+        self._reset()
+
+    def _reset(self):
+        self._inode = None
+        self._offset = 0
+        self._next_id = 0
+        self._tombstones = 0
+        self._messages = {}  # id -> message, type, timestamp; shared by every recipient
+        self._recipients = {}  # id -> recipients still holding it
+        self._by_user = {}  # user -> {id: read}, oldest first
+        self._unread = {}  # user -> unread count
+
+    @contextmanager
+    def _locked(self):
+        with self.path.with_name(self.path.name + ".lock").open("a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _locked_refreshed(self):
+        # Caller holds self._lock; _refresh may create the log, which takes the file lock itself
+        self._refresh()
+        with self._locked():
+            self._refresh()
+            yield
+
+    # Index
+    def _apply(self, record):
+        op, notification_id = record["op"], record["id"]
+        if op == "seq":
+            self._next_id = max(self._next_id, notification_id)
+            return
+        self._next_id = max(self._next_id, notification_id + 1)
+        if op == "add":
+            users = record["users"] if "users" in record else [record["user"]]
+            read_by = set(record.get("read_by", users if record.get("read") else ()))
+            self._messages[notification_id] = {
+                "message": record["message"], "type": record["type"],
+                "timestamp": record["timestamp"], "id": notification_id
+            }
+            self._recipients[notification_id] = len(users)
+            for user in users:
+                read = user in read_by
+                self._by_user.setdefault(user, {})[notification_id] = read
+                if not read:
+                    self._unread[user] = self._unread.get(user, 0) + 1
+            return
+        self._tombstones += 1
+        user_notifications = self._by_user.get(record["user"], {})
+        read = user_notifications.get(notification_id)
+        if read is None:
+            return
+        if not read:
+            self._unread[record["user"]] -= 1
+        if op == "read":
+            user_notifications[notification_id] = True
+            return
+        del user_notifications[notification_id]
+        self._recipients[notification_id] -= 1
+        if not self._recipients[notification_id]:
+            del self._messages[notification_id], self._recipients[notification_id]
+
+    def _notification(self, notification_id, read):
+        return {**self._messages[notification_id], "read": read}
+
+    def _refresh(self):
+        # Caller holds self._lock; pick up lines appended (or a compaction done) by any process
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            self._create()
+            stat = self.path.stat()
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._reset()
+            self._inode = stat.st_ino
+        if stat.st_size == self._offset:
+            return
+        with self.path.open("rb") as f:
+            f.seek(self._offset)
+            data = f.read(stat.st_size - self._offset)
+        # A line is only complete once its newline is written
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if line:
+                self._apply(json.loads(line))
+        self._offset += end
+
+    def _create(self):
+        # First use: import the old notifications.json, if any, as the initial log
+        with self._locked():
+            if self.path.exists():
+                return
+            notifications = {}
+            if self.legacy_file and self.legacy_file.exists():
+                notifications = json.loads(self.legacy_file.read_text() or "{}")
+            self._rewrite(self._records(notifications))
+
+    def _records(self, notifications, next_id=0):
+        records = []
+        for user, user_notifications in notifications.items():
+            for notification in user_notifications:
+                records.append({"op": "add", "id": next_id, "users": [user], "message": notification["message"],
+                                "type": notification["type"], "timestamp": notification["timestamp"],
+                                "read_by": [user] if notification.get("read", False) else []})
+                next_id += 1
+        return [{"op": "seq", "id": next_id}] + records
+
+    def _rewrite(self, records):
+        # Caller holds the file lock: temp file, fsync, rename
+        fd, temp_name = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_name, self.path)
+
+    def _append(self, record):
+        with self._lock, self._locked_refreshed():
+            if record["op"] == "add":
+                record["id"] = self._next_id
+            else:
+                read = self._by_user.get(record["user"], {}).get(record["id"])
+                if read is None or (record["op"] == "read" and read):
+                    return record["id"]
+            # One O_APPEND write per record, so concurrent readers never see half a line
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, (json.dumps(record) + "\n").encode())
+            finally:
+                os.close(fd)
+            self._refresh()
+            compact = self._tombstones >= COMPACT_TOMBSTONES and not self._compacting
+            if compact:
+                self._compacting = True
+        if compact:
+            threading.Thread(target=self.compact, daemon=True).start()
+        return record["id"]
+
+    # Reads
+    def user_notifications(self, user, offset=0, limit=None):
+        """Newest first; pass limit to read one page."""
+        with self._lock:
+            self._refresh()
+            notifications = reversed(self._by_user.get(user, {}).items())
+            return [self._notification(*n) for n in islice(notifications, offset, None if limit is None else offset + limit)]
+
+    def unread_count(self, user):
+        with self._lock:
+            self._refresh()
+            return self._unread.get(user, 0)
+
+    def count(self, user):
+        with self._lock:
+            self._refresh()
+            return len(self._by_user.get(user, {}))
+
+    def load(self):
+        with self._lock:
+            self._refresh()
+            return {user: [self._notification(*n) for n in notifications.items()]
+                    for user, notifications in self._by_user.items() if notifications}
+
+    # Writes
+    def add(self, user, notification):
+        return self.broadcast([user], notification)
+
+    def broadcast(self, users, notification):
+        """One record for every recipient; returns the notification id."""
+        return self._append({"op": "add", "id": None, "users": list(users), "message": notification["message"],
+                             "type": notification["type"], "timestamp": notification["timestamp"],
+                             "read_by": list(users) if notification.get("read", False) else []})
+
+    def mark_read(self, user, notification_id):
+        self._append({"op": "read", "id": notification_id, "user": user})
+
+    def delete(self, user, notification_id):
+        self._append({"op": "delete", "id": notification_id, "user": user})
+
+    def replace_all(self, notifications):
+        with self._lock, self._locked_refreshed():
+            self._rewrite(self._records(notifications, self._next_id))
+            self._refresh()
+
+    def compact(self):
+        """Rewrite the log with only live notifications, folding read tombstones into them."""
+        try:
+            with self._lock, self._locked_refreshed():
+                records = {notification_id: {"op": "add", **message, "users": [], "read_by": []}
+                           for notification_id, message in sorted(self._messages.items())}
+                for user, notifications in self._by_user.items():
+                    for notification_id, read in notifications.items():
+                        records[notification_id]["users"].append(user)
+                        if read:
+                            records[notification_id]["read_by"].append(user)
+                self._rewrite([{"op": "seq", "id": self._next_id}, *records.values()])
+                self._refresh()
+        finally:
+            self._compacting = False
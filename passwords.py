@@ -0,0 +1,91 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# scrypt cost; raising SCRYPT_N makes existing hashes get rehashed on their next login
+SCRYPT_N = int(os.environ.get("AIDEAS_SCRYPT_N", 2 ** 14))
+SCRYPT_R = 8
+SCRYPT_P = 1
+# KDF work runs here, never on a Streamlit script thread; hashlib.scrypt releases the GIL
+KDF_WORKERS = int(os.environ.get("AIDEAS_KDF_WORKERS", min(4, os.cpu_count() or 1)))
+# Hash/verify calls allowed in flight (running or queued) before callers are turned away
+MAX_PENDING = 64
+PENDING_TIMEOUT_SECONDS = 5
+# Of those, bulk hashing (user imports) holds at most this many, so sign-ins always find room
+MAX_BULK_PENDING = 8
+
+_pool = ThreadPoolExecutor(max_workers=KDF_WORKERS, thread_name_prefix="kdf")
+_pending = threading.BoundedSemaphore(MAX_PENDING)
+_bulk_pending = threading.BoundedSemaphore(MAX_BULK_PENDING)
+
+class PasswordServiceBusy(Exception):
+    pass
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * r * n + 1024 * 1024)
+
+def _encode(password, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    salt = os.urandom(16)
+    digest = _scrypt(password, salt, n, r, p)
+    return f"scrypt${n}${r}${p}${base64.b64encode(salt).decode()}${base64.b64encode(digest).decode()}"
+
+def _random_hash():
+    # Well-formed at the current cost, but no password produces it
+    salt, digest = base64.b64encode(os.urandom(16)).decode(), base64.b64encode(os.urandom(64)).decode()
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt}${digest}"
+
+# Checked for unknown employee ids, so they take as long to turn away as a wrong password
+_DUMMY_HASH = _random_hash()
+
+def _check(password, stored):
+    # (matches, new hash if the stored one is legacy SHA-256 or uses an old cost)
+    if stored.startswith("scrypt$"):
+        _, n, r, p, salt, digest = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+        ok = hmac.compare_digest(_scrypt(password, base64.b64decode(salt), n, r, p), base64.b64decode(digest))
+        outdated = (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    else:
+        ok = hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+        outdated = True
+    return ok, (_encode(password) if ok and outdated else None)
+
+def _run(fn, *args, timeout=PENDING_TIMEOUT_SECONDS):
+    if not _pending.acquire(timeout=timeout):
+        raise PasswordServiceBusy("Too many sign-ins in progress, please try again in a moment")
+    try:
+        future = _pool.submit(fn, *args)
+    except BaseException:
+        _pending.release()
+        raise
+    future.add_done_callback(lambda _: _pending.release())
+    return future
+
+def hash_password(password):
+    return _run(_encode, password).result()
+
+def hash_passwords(passwords):
+    # Bulk imports wait for room in their share of the queue instead of failing
+    futures = []
+    for password in passwords:
+        _bulk_pending.acquire()
+        try:
+            future = _run(_encode, password, timeout=None)
+        except BaseException:
+            _bulk_pending.release()
+            raise
+        future.add_done_callback(lambda _: _bulk_pending.release())
+        futures.append(future)
+    return [future.result() for future in futures]
+
+def verify_password(password, stored):
+    """Returns (matches, rehashed) where rehashed is a replacement hash to store, or None.
+
+    stored is None for an unknown user: the check still costs a full KDF run and never matches.
+    """
+    if stored is None:
+        _run(_check, password, _DUMMY_HASH).result()
+        return False, None
+    return _run(_check, password, stored).result()
@@ -0,0 +1,63 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+# Rendered PDFs shared by every session in the process, evicted least-recently-used past this size
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_lock = threading.Lock()
+
+def update_with_frame(key, df):
+    # Cheaper than pd.util.hash_pandas_object for month-sized frames: raw bytes for numeric and
+    # categorical columns, joined text for string columns
+    key.update(json.dumps(list(map(str, df.columns))).encode())
+    for _, values in df.items():
+        values = values.array
+        if isinstance(values, pd.Categorical):
+            key.update(values.codes.tobytes())
+        elif values.dtype.kind in "iufb":
+            key.update(values.to_numpy().tobytes())
+        else:
+            key.update("\x1f".join(map(str, values)).encode())
+        key.update(b"\x1e")
+
+def pdf_cache_key(df, employee_data, month_year, employee_signature=None, screenshots=None, optimize_size=False):
+    key = hashlib.sha256(b"optimized" if optimize_size else b"")
+    update_with_frame(key, df)
+    key.update(json.dumps(employee_data, sort_keys=True, default=str).encode())
+    key.update(json.dumps(list(month_year)).encode())
+    key.update((employee_signature or "").encode())
+    for screenshot in screenshots or []:
+        key.update(screenshot.digest.encode())
+    return key.hexdigest()
+
+def get_cached_pdf(key):
+    with _lock:
+        pdf_data = _cache.get(key)
+        if pdf_data is not None:
+            _cache.move_to_end(key)
+        return pdf_data
+
+def store_pdf(key, pdf_data):
+    global _cache_bytes
+    if len(pdf_data) > MAX_CACHE_BYTES:
+        return
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return
+        _cache[key] = pdf_data
+        _cache_bytes += len(pdf_data)
+        while _cache_bytes > MAX_CACHE_BYTES:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= len(evicted)
+
+def clear_pdf_cache():
+    global _cache_bytes
+    with _lock:
+        _cache.clear()
+        _cache_bytes = 0
@@ -0,0 +1,192 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import uuid
+from collections import OrderedDict, namedtuple
+from concurrent.futures import BrokenExecutor, CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+from pdf_cache import get_cached_pdf, store_pdf
+
+# "process" renders in worker processes so ReportLab's CPU work scales across cores; "thread" keeps
+# everything in this process (tests, single-CPU hosts). Either way no broker is involved.
+PDF_JOB_EXECUTOR = os.environ.get("AIDEAS_PDF_JOBS", "process")
+PDF_WORKERS = int(os.environ.get("AIDEAS_PDF_WORKERS", min(4, os.cpu_count() or 1)))
+# Finished jobs kept for their sessions to pick up, oldest forgotten first
+MAX_FINISHED_JOBS = 64
+# Cancellation flags of running jobs live in a shared array indexed by job number modulo this
+CANCEL_SLOTS = 1024
+# Job ids for PDFs already in the cache are this prefix plus the cache key; no job is allocated for them
+CACHED_JOB_PREFIX = "cached:"
+
+JobStatus = namedtuple("JobStatus", ["state", "done", "total", "error"])
+
+class JobCancelled(Exception):
+    pass
+
+class _Job:
+    def __init__(self, number, key, future):
+        self.number = number
+        self.key = key
+        self.future = future
+        self.started = False
+        self.finished = False  # set once its done callback has run; only then can it be forgotten
+        self.done = 0
+        self.total = 0
+
+_lock = threading.Lock()
+_executor = None
+_progress = None  # (job number, flowables done, flowables total) from the workers
+_cancelled = None  # _cancelled[number % CANCEL_SLOTS] == number once that job is cancelled
+_numbers = itertools.count(1)
+_jobs = OrderedDict()  # job id -> _Job, unfinished and recently finished
+_by_number = {}  # job number -> job id, while unfinished
+_by_key = {}  # PDF cache key -> job id, while unfinished
+
+# Worker side
+def _init_worker(progress, cancelled):
+    global _progress, _cancelled
+    _progress, _cancelled = progress, cancelled
+    # Importing the page module is the slow part of a worker's first job; do it while the pool starts
+    import app  # noqa: F401
+
+def _render(number, args):
+    from app import create_pdf
+
+    def report(done, total):
+        if _cancelled[number % CANCEL_SLOTS] == number:
+            raise JobCancelled()
+        _progress.put((number, done, total))
+
+    return create_pdf(*args, progress=report)
+
+# Server side
+def _start():
+    # The progress queue and cancel flags outlive the pools, which are replaced when one breaks
+    global _executor, _progress, _cancelled
+    if PDF_JOB_EXECUTOR == "thread":
+        if _progress is None:
+            _progress, _cancelled = queue.SimpleQueue(), [0] * CANCEL_SLOTS
+            threading.Thread(target=_collect_progress, daemon=True, name="pdf-progress").start()
+        _executor = ThreadPoolExecutor(max_workers=PDF_WORKERS, thread_name_prefix="pdf")
+    else:
+        # spawn, not fork: the server process is full of threads holding locks
+        context = multiprocessing.get_context("spawn")
+        if _progress is None:
+            _progress, _cancelled = context.SimpleQueue(), context.RawArray("q", CANCEL_SLOTS)
+            threading.Thread(target=_collect_progress, daemon=True, name="pdf-progress").start()
+        _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=context,
+                                        initializer=_init_worker, initargs=(_progress, _cancelled))
+
+def _drop_broken(executor):
+    # A worker died (out of memory, a crash in PIL): the pool has failed all its jobs and takes no more.
+    # Call with _lock held; the next submit starts a new pool.
+    global _executor
+    if _executor is executor:
+        _executor = None
+        executor.shutdown(wait=False)
+
+def _collect_progress():
+    while True:
+        number, done, total = _progress.get()
+        with _lock:
+            job = _jobs.get(_by_number.get(number))
+            if job is not None:
+                job.started = True
+                job.done, job.total = done, total
+
+def _finished(job_id, key, number, executor, future):
+    with _lock:
+        if not future.cancelled() and isinstance(future.exception(), BrokenExecutor):
+            _drop_broken(executor)
+        _by_number.pop(number, None)
+        if _by_key.get(key) == job_id:
+            del _by_key[key]
+        job = _jobs.get(job_id)
+        if job is not None:
+            job.finished = True
+            _jobs.move_to_end(job_id)
+        _forget_finished()
+    if not future.cancelled() and future.exception() is None:
+        store_pdf(key, future.result())
+
+def _forget_finished():
+    finished = [job_id for job_id, job in _jobs.items() if job.finished]
+    for job_id in finished[:-MAX_FINISHED_JOBS]:
+        del _jobs[job_id]
+
+def submit_pdf(key, df, employee_data, month_year, employee_signature=None, screenshots=None, optimize_size=False):
+    """Queue a PDF render and return its job id. A PDF already cached or being rendered is not rendered again."""
+    if get_cached_pdf(key) is not None:
+        return CACHED_JOB_PREFIX + key
+    with _lock:
+        if key in _by_key:
+            return _by_key[key]
+        number = next(_numbers)
+        # The caller may keep editing its frame; the job renders its own copy
+        args = (df.copy(), employee_data, month_year, employee_signature, list(screenshots or []), optimize_size)
+        if _executor is None:
+            _start()
+        try:
+            future = _executor.submit(_render, number, args)
+        except BrokenExecutor:
+            # Broke before its failed jobs reported back
+            _drop_broken(_executor)
+            _start()
+            future = _executor.submit(_render, number, args)
+        executor = _executor
+        job_id = uuid.uuid4().hex
+        _jobs[job_id] = _Job(number, key, future)
+        _by_number[number] = job_id
+        _by_key[key] = job_id
+    future.add_done_callback(lambda future: _finished(job_id, key, number, executor, future))
+    return job_id
+
+def job_status(job_id):
+    """JobStatus for job_id, or None if it is unknown (or long finished, or its cached PDF was evicted)."""
+    if job_id.startswith(CACHED_JOB_PREFIX):
+        return JobStatus("done", 0, 0, None) if get_cached_pdf(job_id[len(CACHED_JOB_PREFIX):]) is not None else None
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        future, done, total = job.future, job.done, job.total
+        state = "running" if job.started else "queued"
+    if future.done():
+        if future.cancelled():
+            return JobStatus("cancelled", done, total, None)
+        error = future.exception()
+        if isinstance(error, JobCancelled):
+            return JobStatus("cancelled", done, total, None)
+        if error is not None:
+            return JobStatus("failed", done, total, error)
+        return JobStatus("done", total, total, None)
+    return JobStatus(state, done, total, None)
+
+def job_result(job_id, timeout=None):
+    """The rendered PDF; waits for the job to finish. Raises CancelledError, the render's error, or KeyError
+    for a job job_status no longer knows."""
+    if job_id.startswith(CACHED_JOB_PREFIX):
+        pdf_data = get_cached_pdf(job_id[len(CACHED_JOB_PREFIX):])
+        if pdf_data is None:
+            raise KeyError(job_id)
+        return pdf_data
+    with _lock:
+        future = _jobs[job_id].future
+    try:
+        return future.result(timeout)
+    except JobCancelled:
+        raise CancelledError() from None
+
+def cancel_job(job_id):
+    # A queued job never starts; a running one stops at its next progress report
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job.future.done():
+            # Unknown, finished, or a cached PDF: nothing to stop
+            return
+        if _by_key.get(job.key) == job_id:
+            del _by_key[job.key]
+        _cancelled[job.number % CANCEL_SLOTS] = job.number
+    # Outside the lock: cancelling runs the done callback right here
+    job.future.cancel()
@@ -0,0 +1,226 @@
+import copy
+import re
+import zlib
+from collections import namedtuple
+from functools import lru_cache
+from io import BytesIO
+from PIL import Image, ImageChops
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfdoc import PDFImageXObject
+from reportlab.platypus import Flowable, TableStyle
+from blob_store import open_blob
+
+# ASCII85 makes every image and page stream a quarter bigger, only to keep the file 7-bit clean
+rl_config.useA85 = 0
+
+LOGO_FILE = "aideas_logo.png"
+# Table rows a month can have, after the header
+MAX_TABLE_ROWS = 31
+
+# Size-optimized PDFs: images are resampled to at most this many pixels per inch of the box they are
+# drawn in, photos are stored as JPEG and everything else losslessly
+OPTIMIZED_DPI = 120
+JPEG_QUALITY = 80
+# A nearest-neighbour sample with more distinct colours than this is a photo rather than a screen
+PHOTO_COLORS = 4096
+# pdf_size_report sections, by the first part of an image's XObject name
+IMAGE_SECTIONS = {"logo": "logo", "signature": "signature", "screenshot": "screenshots"}
+
+# Background per row style key (day type, or WFH for working-from-home days)
+PDF_ROW_COLORS = {
+    "Holiday": colors.Color(1, 0.9, 0.8),
+    "Week Off": colors.Color(1, 0.98, 0.9),
+    "Sick Leave": colors.Color(0.784, 0.902, 0.788),
+    "Earned Leave": colors.Color(0.784, 0.902, 0.788),
+    "WFH": colors.Color(0.9, 0.95, 1.0),
+}
+
+TABLE_COMMANDS = [
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 9),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('TOPPADING', (0, 0), (-1, 0), 8),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (5, 0), (5, -1), 'LEFT'),
+    ('VALIGN', (5, 0), (5, -1), 'TOP'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('INNERGRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('BOX', (0, 0), (-1, -1), 1, colors.black),
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 1), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+]
+
+SIGNATURE_COMMANDS = [
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONT', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+]
+
+# An image encoded once into a PDF image XObject, and its soft mask if it has one; shared, never modified
+EncodedImage = namedtuple("EncodedImage", ["name", "xobject", "smask"])
+
+def encode_image(xobject):
+    # The soft mask is split off because each document numbers its reference to it
+    smask = getattr(xobject, "_smask", None)
+    if smask is not None:
+        xobject = copy.copy(xobject)
+        del xobject._smask
+    return EncodedImage(xobject.name, xobject, smask)
+
+class PrecompiledImage(Flowable):
+    """Draws an EncodedImage into one document.
+
+    ReportLab's own Image flowable decodes, compresses and re-encodes the file again for every
+    document it is drawn in. Flowables keep per-document state while they are laid out and drawn, so
+    each document gets its own PrecompiledImage; only the EncodedImage is shared. Images with the same
+    name are stored once per document.
+    """
+
+    def __init__(self, image, width, height, hAlign="CENTER"):
+        super().__init__()
+        self.drawWidth, self.drawHeight = width, height
+        self.hAlign = hAlign
+        self._image = image
+
+    def wrap(self, availWidth, availHeight):
+        return self.drawWidth, self.drawHeight
+
+    def draw(self):
+        canvas, doc = self.canv, self.canv._doc
+        name, xobject, smask = self._image
+        # Same registration Canvas.drawImage does (ReportLab internals, see the pin in requirements.txt), with
+        # the encoded streams copied in instead of rebuilt; copies, because the soft mask reference is per document
+        reg_name = doc.getXObjectName(name)
+        if doc.idToObject.get(reg_name) is None:
+            xobject = copy.copy(xobject)
+            canvas._setXObjects(xobject)
+            doc.Reference(xobject, reg_name)
+            doc.addForm(name, xobject)
+            if smask is not None:
+                smask = copy.copy(smask)
+                canvas._setXObjects(smask)
+                xobject.smask = doc.Reference(smask, doc.getXObjectName(smask.name))
+        canvas._currentPageHasImages = 1
+        canvas.saveState()
+        canvas.scale(self.drawWidth, self.drawHeight)
+        canvas._code.append(f"/{reg_name} Do")
+        canvas.restoreState()
+        canvas._formsinuse.append(name)
+
+class PdfTemplate:
+    """Everything create_pdf draws that does not depend on the timesheet."""
+
+    def __init__(self, logo_path=LOGO_FILE):
+        styles = getSampleStyleSheet()
+        self.title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=16, spaceAfter=20, alignment=1)
+        self.info_style = ParagraphStyle('Info', parent=styles['Normal'], fontSize=10, spaceAfter=3)
+        self.body_style = ParagraphStyle('CustomBody', parent=styles['Normal'], fontSize=8, leading=10, spaceBefore=0, spaceAfter=0, leftIndent=0, rightIndent=0)
+        self.logo_image = encode_image(PDFImageXObject("logo", ImageReader(logo_path), mask="auto"))
+        self.signature_style = TableStyle(SIGNATURE_COMMANDS)
+        # row_backgrounds[style_key][row] is that row's background command; row 0 is the header
+        self.row_backgrounds = {
+            style_key: [('BACKGROUND', (0, row), (-1, row), color) for row in range(MAX_TABLE_ROWS + 1)]
+            for style_key, color in PDF_ROW_COLORS.items()
+        }
+
+    def logo(self):
+        return PrecompiledImage(self.logo_image, 2*inch, 0.8*inch)
+
+    def table_style(self, style_keys):
+        # style_keys: one row style key per table row, header excluded
+        backgrounds = self.row_backgrounds
+        return TableStyle(TABLE_COMMANDS + [
+            backgrounds[key][row] for row, key in enumerate(style_keys, 1) if key in backgrounds
+        ])
+
+def _is_photo(image):
+    sample = image.resize((min(image.width, 256), min(image.height, 256)), Image.Resampling.NEAREST)
+    return sample.getcolors(PHOTO_COLORS) is None
+
+@lru_cache(maxsize=32)
+def compact_image(name, digest, max_size):
+    """EncodedImage of the blob's image scaled down to fit max_size pixels: JPEG for photos, flate otherwise.
+
+    Cached, so re-rendering a timesheet after an edit does not recompress its screenshots.
+    """
+    with open_blob(digest) as data:
+        image = Image.open(data)
+        image.draft("RGB", max_size)
+        image = image.convert("RGB")
+    image.thumbnail(max_size, Image.Resampling.LANCZOS)
+    xobject = PDFImageXObject(name)
+    xobject.width, xobject.height = image.size
+    xobject.bitsPerComponent = 8
+    xobject.mask = None
+    if _is_photo(image):
+        buffer = BytesIO()
+        image.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+        xobject.colorSpace, xobject._filters = "DeviceRGB", ("DCTDecode",)
+        xobject.streamContent = buffer.getvalue()
+        return encode_image(xobject)
+    red, green, blue = image.split()
+    if ImageChops.difference(red, green).getbbox() is None and ImageChops.difference(green, blue).getbbox() is None:
+        xobject.colorSpace, image = "DeviceGray", red
+    else:
+        xobject.colorSpace = "DeviceRGB"
+    xobject._filters = ("FlateDecode",)
+    xobject.streamContent = zlib.compress(image.tobytes(), 9)
+    return encode_image(xobject)
+
+def optimized_image(name, digest, width, height, hAlign="CENTER"):
+    max_size = (round(width / 72 * OPTIMIZED_DPI), round(height / 72 * OPTIMIZED_DPI))
+    return PrecompiledImage(compact_image(name, digest, max_size), width, height, hAlign)
+
+def blob_image(name, digest, width, height, hAlign="CENTER"):
+    # The blob's image as uploaded, encoded like ReportLab's Image flowable would, but under a known name
+    with open_blob(digest) as data:
+        image = encode_image(PDFImageXObject(name, ImageReader(data), mask="auto"))
+    return PrecompiledImage(image, width, height, hAlign)
+
+def pdf_size_report(pdf_data):
+    """Bytes per section of a PDF from create_pdf, as {section: bytes}, largest first.
+
+    Objects are measured between their xref offsets; images are attributed by their XObject name, which
+    optimized_image and blob_image give the signature and screenshots.
+    """
+    xref_start = int(pdf_data[pdf_data.rindex(b"startxref"):].split()[1])
+    count = int(pdf_data[xref_start:xref_start + 64].split()[2])
+    offsets = sorted(map(int, re.findall(rb"(\d{10}) \d{5} n", pdf_data[xref_start:xref_start + 20 * count + 64])))
+    offsets.append(xref_start)
+    image_names = {int(number): name.decode() for name, number in re.findall(rb"/FormXob\.([\w.-]+) (\d+) 0 R", pdf_data)}
+    sections = {"structure": offsets[0] + len(pdf_data) - xref_start}
+    for start, end in zip(offsets, offsets[1:]):
+        number = int(pdf_data[start:start + 16].split()[0])
+        header, *stream = pdf_data[start:min(end, start + 512)].split(b"stream", 1)
+        if b"/Subtype /Image" in header:
+            # A soft mask belongs to the same section as the image that points at it (written just before it)
+            name = image_names.get(number, "")
+            smask = re.search(rb"/SMask (\d+) 0 R", header)
+            if smask:
+                image_names[int(smask.group(1))] = name
+            section = IMAGE_SECTIONS.get(name.split(".")[0], "other images")
+        elif b"/Type /Font" in header:
+            section = "fonts"
+        elif stream:
+            section = "pages (tables and text)"
+        else:
+            section = "structure"
+        sections[section] = sections.get(section, 0) + end - start
+    return dict(sorted(sections.items(), key=lambda item: -item[1]))
+
+@lru_cache(maxsize=None)
+def pdf_template():
+    """The process-wide PdfTemplate, built on first use."""
+    return PdfTemplate()
@@ -0,0 +1,90 @@
+import hashlib
+import io
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from PIL import Image
+from blob_store import blob_path, put_blob
+
+# create_pdf draws screenshots into at most 500x700 pt; anything beyond this DPI is never visible
+SCREENSHOT_DPI = 150
+MAX_SCREENSHOT_SIZE = (round(500 / 72 * SCREENSHOT_DPI), round(700 / 72 * SCREENSHOT_DPI))
+
+# Previews are shown 200px wide
+THUMBNAIL_SIZE = (200, 1000)
+
+# set_page_config re-encodes its page_icon on every run; hand it an already small PNG
+FAVICON_SIZE = (64, 64)
+
+# PIL releases the GIL while decoding, resizing and encoding, so threads give real parallelism here
+_executor = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="screenshots")
+
+@dataclass(frozen=True, slots=True)
+class Screenshot:
+    # Everything the preview and PDF layout need, built once at ingest so nothing re-decodes the image.
+    # The PNG itself lives in the blob store under digest.
+    digest: str
+    width: int
+    height: int
+    thumbnail: bytes
+
+def encode_png(image):
+    img_byte_arr = io.BytesIO()
+    image.save(img_byte_arr, format='PNG')
+    return img_byte_arr.getvalue()
+
+@lru_cache(maxsize=None)
+def favicon(path):
+    image = Image.open(path)
+    image.thumbnail(FAVICON_SIZE, Image.Resampling.LANCZOS)
+    return encode_png(image)
+
+def pixel_digest(image):
+    # Same screen saved with a different encoder, colour mode or metadata decodes to the same pixels.
+    # A low-resolution perceptual hash is deliberately not used: SAP screens differ only in small text
+    # and would collide.
+    return hashlib.sha256(image.tobytes()).hexdigest()
+
+def process_screenshot(image_bytes):
+    image = Image.open(io.BytesIO(image_bytes))
+    # Lets the JPEG decoder downscale by a power of two while decoding; a no-op for PNG
+    image.draft('RGB', MAX_SCREENSHOT_SIZE)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.thumbnail(MAX_SCREENSHOT_SIZE, Image.Resampling.LANCZOS)
+    thumbnail = image.copy()
+    thumbnail.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+    screenshot = Screenshot(put_blob(encode_png(image)), image.width, image.height, encode_png(thumbnail))
+    return hashlib.sha256(image_bytes).hexdigest(), pixel_digest(image), screenshot
+
+def process_screenshots(uploaded_files, cache=None):
+    # cache is a per-session {upload id: (upload digest, pixel digest, Screenshot)} dict so each upload
+    # is decoded only once; entries for files that are no longer uploaded are dropped
+    cache = {} if cache is None else cache
+    current = {}
+    for uploaded_file in uploaded_files or []:
+        upload_id = getattr(uploaded_file, "file_id", None)
+        if upload_id is None:
+            upload_id = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+        # A session that went idle may have had its blobs cleaned up; those uploads are processed again
+        if upload_id in cache and blob_path(cache[upload_id][2].digest).exists():
+            current[upload_id] = cache[upload_id]
+        elif upload_id not in current:
+            current[upload_id] = _executor.submit(process_screenshot, uploaded_file.getvalue())
+    for upload_id, entry in current.items():
+        if isinstance(entry, Future):
+            current[upload_id] = entry.result()
+    cache.clear()
+    cache.update(current)
+    
+    # Drop byte-identical uploads and re-encoded copies with identical pixels
+    processed_images = []
+    seen_digests, seen_pixels = set(), set()
+    for digest, pixels, screenshot in current.values():
+        if digest in seen_digests or pixels in seen_pixels:
+            continue
+        seen_digests.add(digest)
+        seen_pixels.add(pixels)
+        processed_images.append(screenshot)
+    return processed_images
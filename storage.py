@@ -0,0 +1,790 @@
+import argparse
+import fcntl
+import heapq
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from types import MappingProxyType
+
+from notification_log import NOTIFICATION_LOG_FILE, NotificationLog
+from user_index import UserIndex
+
+# Backend for users, notifications and registration requests: "json" (the original files) or "sqlite"
+STORAGE_BACKEND = os.environ.get("AIDEAS_STORAGE", "json")
+SQLITE_PATH = Path(os.environ.get("AIDEAS_DB_PATH", "aideas.db"))
+
+USERS_FILE = Path("users.json")
+NOTIFICATIONS_FILE = Path("notifications.json")
+REGISTRATION_REQUESTS_FILE = Path("registration_requests.json")
+PASSWORD_RESET_REQUESTS_FILE = Path("password_reset_requests.json")
+# Optimistic compare-and-swap attempts before an update falls back to holding the lock throughout
+CAS_RETRIES = 20
+
+def freeze(value):
+    # Read-only view of parsed JSON, so a cached snapshot can be shared without being mutated by accident
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def thaw(value):
+    # Mutable copy of a frozen snapshot; also json.dump's fallback, so a loaded snapshot can be saved back as-is
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+class JsonStorage:
+    """Whole-file JSON stores; row operations are versioned read-modify-writes committed by atomic rename.
+
+    Like SqliteStorage, loads return read-only snapshots (see freeze).
+    """
+
+    def __init__(self, users_file=USERS_FILE, notifications_file=NOTIFICATIONS_FILE,
+                 registration_requests_file=REGISTRATION_REQUESTS_FILE, notification_log_file=NOTIFICATION_LOG_FILE,
+                 password_reset_requests_file=PASSWORD_RESET_REQUESTS_FILE):
+        self.users_file = Path(users_file)
+        self.notifications_file = Path(notifications_file)
+        # Notifications live in an append-only log; notifications.json is only read to seed it
+        self.notification_log = NotificationLog(notification_log_file, legacy_file=self.notifications_file)
+        self.registration_requests_file = Path(registration_requests_file)
+        self.password_reset_requests_file = Path(password_reset_requests_file)
+        # path -> (file signature, frozen snapshot), shared by every session in the process
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        # Search index over the users snapshot it was built from
+        self._user_index = (None, None)
+        self._user_index_lock = threading.Lock()
+        # Min-heap of (expires_at, user_id) over the reset requests snapshot it was built from
+        self._reset_expiry = (None, [])
+
+    def _signature(self, path):
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _lock_path(self, path):
+        return path.with_name(path.name + ".lock")
+
+    @contextmanager
+    def _locked(self, path):
+        # Advisory lock shared by every process writing this store; the lock file also holds its version counter
+        with self._lock_path(path).open("a+") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield lock
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _version(self, path):
+        try:
+            return int(self._lock_path(path).read_text() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _write(self, path, data, lock):
+        # Caller holds the lock: temp file, fsync, rename over the store, then bump the version
+        fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=4, default=thaw)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_name, path)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+        lock.seek(0)
+        version = int(lock.read() or 0) + 1
+        lock.seek(0)
+        lock.truncate()
+        lock.write(str(version))
+        lock.flush()
+        with self._cache_lock:
+            self._cache.pop(path, None)
+
+    def _read(self, path):
+        # Fresh, mutable parse for the read-modify-write paths
+        try:
+            return json.loads(path.read_text())
+        except FileNotFoundError:
+            return {}
+
+    def _load(self, path):
+        # Reparse only when the file's mtime, size or inode changed since the cached snapshot
+        try:
+            signature = self._signature(path)
+        except FileNotFoundError:
+            # Created under the lock and only if still missing, so a concurrent writer's first commit is kept
+            with self._locked(path) as lock:
+                if not path.exists():
+                    self._write(path, {}, lock)
+            signature = self._signature(path)
+        with self._cache_lock:
+            cached = self._cache.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        snapshot = freeze(json.loads(path.read_text()))
+        with self._cache_lock:
+            self._cache[path] = (signature, snapshot)
+        return snapshot
+
+    def _save(self, path, data):
+        with self._locked(path) as lock:
+            self._write(path, data, lock)
+
+    def _update(self, path, change):
+        # Read without the lock, apply change, and commit only if nobody bumped the version meanwhile.
+        # change mutates the parsed data in place and returns False when there is nothing to write.
+        for _ in range(CAS_RETRIES):
+            version = self._version(path)
+            data = self._read(path)
+            if change(data) is False:
+                return
+            with self._locked(path) as lock:
+                if self._version(path) == version:
+                    self._write(path, data, lock)
+                    return
+        with self._locked(path) as lock:
+            data = self._read(path)
+            if change(data) is not False:
+                self._write(path, data, lock)
+
+    @contextmanager
+    def transaction(self):
+        yield
+
+    # Users
+    def load_users(self):
+        return self._load(self.users_file)
+
+    def save_users(self, users):
+        self._save(self.users_file, users)
+
+    def count_users(self):
+        return len(self.load_users()) if self.users_file.exists() else 0
+
+    def get_user(self, user_id):
+        return self.load_users().get(user_id)
+
+    def put_user(self, user_id, user):
+        def change(users):
+            users[user_id] = user
+        self._update_users(change, lambda index, users: index.put(user_id, users[user_id]))
+
+    def put_users(self, new_users):
+        # One write for a whole batch
+        def index_users(index, users):
+            for user_id in new_users:
+                index.put(user_id, users[user_id])
+        self._update_users(lambda users: users.update(new_users), index_users)
+
+    def update_user(self, user_id, **fields):
+        def change(users):
+            if user_id not in users:
+                return False
+            # Replaces the row rather than mutating it, so change also applies to a copy of a frozen snapshot
+            users[user_id] = {**users[user_id], **fields}
+        self._update_users(change, lambda index, users: index.put(user_id, users[user_id]))
+
+    def delete_user(self, user_id):
+        self._update_users(lambda users: users.pop(user_id, None) is not None,
+                           lambda index, users: index.remove(user_id))
+
+    def _indexed_users(self):
+        users = self.load_users()
+        with self._user_index_lock:
+            if self._user_index[0] is not users:
+                self._user_index = (users, UserIndex(users))
+            return self._user_index
+
+    def _update_users(self, change, index_change):
+        previous = self.load_users()
+        self._update(self.users_file, change)
+        # Apply our own write to the index instead of rebuilding it, but only if it was built from the snapshot
+        # just before the write and nobody else wrote in between; otherwise the next search rebuilds it
+        users = self.load_users()
+        if users is previous:
+            return
+        expected = dict(previous)
+        change(expected)
+        with self._user_index_lock:
+            snapshot, index = self._user_index
+            if index is None:
+                return
+            if snapshot is not previous or users != expected:
+                self._user_index = (None, None)
+                return
+            index_change(index, users)
+            self._user_index = (users, index)
+
+    def search_users(self, query="", offset=0, limit=None):
+        """Page of (employee id, user) sorted by id, and the number of matches."""
+        users, index = self._indexed_users()
+        with self._user_index_lock:
+            user_ids, total = index.search(query, offset, limit)
+        return [(user_id, users[user_id]) for user_id in user_ids], total
+
+    def role_counts(self):
+        """(total users, admin users)"""
+        _, index = self._indexed_users()
+        with self._user_index_lock:
+            return index.role_counts()
+
+    # Notifications
+    def load_notifications(self):
+        return self.notification_log.load()
+
+    def save_notifications(self, notifications):
+        self.notification_log.replace_all(notifications)
+
+    def user_notifications(self, user_id, offset=0, limit=None):
+        return self.notification_log.user_notifications(user_id, offset, limit)
+
+    def count_notifications(self, user_id):
+        return self.notification_log.count(user_id)
+
+    def unread_count(self, user_id):
+        return self.notification_log.unread_count(user_id)
+
+    def add_notification(self, user_id, notification):
+        return self.notification_log.add(user_id, notification)
+
+    def broadcast_notification(self, user_ids, notification):
+        return self.notification_log.broadcast(user_ids, notification)
+
+    def mark_notification_read(self, user_id, notification_id):
+        self.notification_log.mark_read(user_id, notification_id)
+
+    def delete_notification(self, user_id, notification_id):
+        self.notification_log.delete(user_id, notification_id)
+
+    # Registration requests
+    def load_registration_requests(self):
+        return self._load(self.registration_requests_file)
+
+    def save_registration_requests(self, requests):
+        self._save(self.registration_requests_file, requests)
+
+    def get_registration_request(self, user_id):
+        return self.load_registration_requests().get(user_id)
+
+    def put_registration_request(self, user_id, request):
+        def change(requests):
+            requests[user_id] = request
+        self._update(self.registration_requests_file, change)
+
+    def set_registration_status(self, user_id, status):
+        def change(requests):
+            if user_id not in requests:
+                return False
+            requests[user_id]["status"] = status
+        self._update(self.registration_requests_file, change)
+
+    def delete_registration_request(self, user_id):
+        self._update(self.registration_requests_file, lambda requests: requests.pop(user_id, None) is not None)
+
+    def process_registration_requests(self, approved_users, rejected_ids, notification=None):
+        # One write per store: add the approved users, then drop every processed request (plus rejected
+        # or already-registered leftovers), then one notification record for all the approved users
+        def add_users(users):
+            new_users = {user_id: user for user_id, user in approved_users.items() if user_id not in users}
+            users.update(new_users)
+            return bool(new_users)
+        if approved_users:
+            def index_users(index, users):
+                for user_id in approved_users:
+                    index.put(user_id, users[user_id])
+            self._update_users(add_users, index_users)
+        users = self.load_users()
+        processed = set(approved_users) | set(rejected_ids)
+        def drop_processed(requests):
+            removed = [user_id for user_id, request in requests.items()
+                       if user_id in processed or user_id in users or request["status"] != "pending"]
+            for user_id in removed:
+                del requests[user_id]
+            return bool(removed)
+        self._update(self.registration_requests_file, drop_processed)
+        if approved_users and notification is not None:
+            self.broadcast_notification(list(approved_users), notification)
+
+    # Password reset requests, each {"timestamp", "expires_at"}
+    def load_password_reset_requests(self):
+        return self._load(self.password_reset_requests_file)
+
+    def save_password_reset_requests(self, requests):
+        self._save(self.password_reset_requests_file, requests)
+
+    def put_password_reset_request(self, user_id, request):
+        def change(requests):
+            requests[user_id] = request
+        self._update_reset_requests(change, (request["expires_at"], user_id))
+
+    def delete_password_reset_request(self, user_id):
+        # The heap entry goes stale and is skipped when it reaches the top
+        self._update_reset_requests(lambda requests: requests.pop(user_id, None) is not None)
+
+    def _update_reset_requests(self, change, entry=None):
+        previous = self.load_password_reset_requests()
+        self._update(self.password_reset_requests_file, change)
+        # Keep the heap across our own write instead of rebuilding it, but only if it was built from the
+        # snapshot just before the write and nobody else wrote in between; otherwise the next expiry rebuilds it
+        requests = self.load_password_reset_requests()
+        expected = dict(previous)
+        change(expected)
+        with self._cache_lock:
+            heap = self._reset_expiry[1]
+            if self._reset_expiry[0] is not previous or requests != expected:
+                self._reset_expiry = (None, [])
+                return
+            if entry is not None:
+                heapq.heappush(heap, entry)
+            self._reset_expiry = (requests, heap)
+
+    def expire_password_reset_requests(self, now):
+        requests = self.load_password_reset_requests()
+        with self._cache_lock:
+            if self._reset_expiry[0] is not requests:
+                heap = [(request["expires_at"], user_id) for user_id, request in requests.items()]
+                heapq.heapify(heap)
+                self._reset_expiry = (requests, heap)
+            heap = self._reset_expiry[1]
+            expired = []
+            while heap and heap[0][0] <= now:
+                expired.append(heapq.heappop(heap)[1])
+        if expired:
+            def change(requests):
+                # Skip ids whose request was renewed or already removed since the heap entry was pushed
+                removed = [user_id for user_id in expired
+                           if user_id in requests and requests[user_id]["expires_at"] <= now]
+                for user_id in removed:
+                    del requests[user_id]
+                return bool(removed)
+            self._update_reset_requests(change)
+
+    def pending_password_reset_requests(self, now):
+        self.expire_password_reset_requests(now)
+        requests = self.load_password_reset_requests()
+        return sorted(((user_id, request) for user_id, request in requests.items() if request["expires_at"] > now),
+                      key=lambda item: item[1]["timestamp"])
+
+    def count_password_reset_requests(self, now):
+        self.expire_password_reset_requests(now)
+        return len(self.load_password_reset_requests())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    employee_id TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    is_admin INTEGER NOT NULL DEFAULT 0,
+    name TEXT NOT NULL DEFAULT '',
+    email TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS user_role_counts (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    total INTEGER NOT NULL,
+    admins INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO user_role_counts SELECT 0, COUNT(*), COALESCE(SUM(is_admin), 0) FROM users;
+CREATE TRIGGER IF NOT EXISTS user_role_counts_insert AFTER INSERT ON users BEGIN
+    UPDATE user_role_counts SET total = total + 1, admins = admins + new.is_admin;
+END;
+CREATE TRIGGER IF NOT EXISTS user_role_counts_delete AFTER DELETE ON users BEGIN
+    UPDATE user_role_counts SET total = total - 1, admins = admins - old.is_admin;
+END;
+CREATE TRIGGER IF NOT EXISTS user_role_counts_update AFTER UPDATE OF is_admin ON users BEGIN
+    UPDATE user_role_counts SET admins = admins - old.is_admin + new.is_admin;
+END;
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id TEXT NOT NULL,
+    message TEXT NOT NULL,
+    type TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    read INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS notifications_by_user ON notifications (employee_id, timestamp);
+CREATE INDEX IF NOT EXISTS unread_notifications_by_user ON notifications (employee_id) WHERE read = 0;
+CREATE TABLE IF NOT EXISTS notification_recipients (
+    employee_id TEXT NOT NULL,
+    notification_id INTEGER NOT NULL REFERENCES notifications (id),
+    read INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (employee_id, notification_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS registration_requests (
+    employee_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    password TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS registration_requests_by_status ON registration_requests (status);
+CREATE TABLE IF NOT EXISTS password_reset_requests (
+    employee_id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    expires_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS password_reset_requests_by_expiry ON password_reset_requests (expires_at);
+"""
+
+# Trigram full-text index over id, name and email for substring search; needs SQLite 3.34+
+USER_SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE users_search USING fts5(
+    employee_id, name, email, content='users', content_rowid='rowid', tokenize='trigram'
+);
+CREATE TRIGGER users_search_insert AFTER INSERT ON users BEGIN
+    INSERT INTO users_search (rowid, employee_id, name, email) VALUES (new.rowid, new.employee_id, new.name, new.email);
+END;
+CREATE TRIGGER users_search_delete AFTER DELETE ON users BEGIN
+    INSERT INTO users_search (users_search, rowid, employee_id, name, email)
+    VALUES ('delete', old.rowid, old.employee_id, old.name, old.email);
+END;
+CREATE TRIGGER users_search_update AFTER UPDATE ON users BEGIN
+    INSERT INTO users_search (users_search, rowid, employee_id, name, email)
+    VALUES ('delete', old.rowid, old.employee_id, old.name, old.email);
+    INSERT INTO users_search (rowid, employee_id, name, email) VALUES (new.rowid, new.employee_id, new.name, new.email);
+END;
+INSERT INTO users_search (users_search) VALUES ('rebuild');
+"""
+
+USER_COLUMNS = ("password", "is_admin", "name", "email")
+# Owner of a broadcast's single notifications row; who receives it is in notification_recipients
+BROADCAST = "*"
+# A user's direct notifications plus the broadcasts addressed to them
+USER_NOTIFICATIONS = f"""
+SELECT employee_id, id, message, type, timestamp, read FROM notifications WHERE employee_id != '{BROADCAST}'
+UNION ALL
+SELECT r.employee_id, n.id, n.message, n.type, n.timestamp, r.read
+FROM notification_recipients r JOIN notifications n ON n.id = r.notification_id
+"""
+REQUEST_COLUMNS = ("name", "email", "password", "timestamp", "status")
+
+class SqliteStorage:
+    """SQLite in WAL mode: indexed tables, row-level updates, readers never block on a writer."""
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = Path(path)
+        # Streamlit runs each session on its own thread and sqlite3 connections are per-thread
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        if not self._has_search_index(conn):
+            try:
+                conn.executescript(f"BEGIN IMMEDIATE; {USER_SEARCH_SCHEMA} COMMIT;")
+            except sqlite3.OperationalError:
+                # No FTS5 trigram tokenizer in this SQLite build (or another process just created it)
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+        # Without it, search falls back to LIKE scans
+        self.has_search_index = self._has_search_index(conn)
+
+    def _has_search_index(self, conn):
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'users_search'").fetchone() is not None
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self._conn()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # Users
+    def _user(self, row):
+        return freeze({"password": row["password"], "is_admin": bool(row["is_admin"]), "name": row["name"], "email": row["email"]})
+
+    def load_users(self):
+        rows = self._conn().execute("SELECT * FROM users ORDER BY employee_id")
+        return MappingProxyType({row["employee_id"]: self._user(row) for row in rows})
+
+    def save_users(self, users):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM users")
+            for user_id, user in users.items():
+                self.put_user(user_id, user)
+
+    def count_users(self):
+        return self._conn().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def get_user(self, user_id):
+        row = self._conn().execute("SELECT * FROM users WHERE employee_id = ?", (user_id,)).fetchone()
+        return self._user(row) if row else None
+
+    def put_user(self, user_id, user):
+        with self.transaction() as conn:
+            conn.execute(
+                # An upsert, not INSERT OR REPLACE, so the update triggers keep the search index and role counts right
+                "INSERT INTO users (employee_id, password, is_admin, name, email) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (employee_id) DO UPDATE SET password = excluded.password, is_admin = excluded.is_admin, "
+                "name = excluded.name, email = excluded.email",
+                (user_id, user["password"], int(user.get("is_admin", False)), user.get("name", ""), user.get("email", ""))
+            )
+
+    def put_users(self, users):
+        with self.transaction():
+            for user_id, user in users.items():
+                self.put_user(user_id, user)
+
+    def search_users(self, query="", offset=0, limit=None):
+        """Page of (employee id, user) sorted by id, and the number of matches."""
+        query = query.strip()
+        page = (-1 if limit is None else limit, offset)
+        conn = self._conn()
+        if not query:
+            rows = conn.execute("SELECT * FROM users ORDER BY employee_id LIMIT ? OFFSET ?", page)
+            total = self.role_counts()[0]
+        else:
+            # Id prefixes are a range of the primary key; names and emails are substring matches
+            id_range = (query, query + "\U0010ffff")
+            if self.has_search_index and len(query) >= 3:
+                text = '{name email} : "' + query.replace('"', '""') + '"'
+                where = ("WHERE employee_id >= ?1 AND employee_id < ?2 OR "
+                         "rowid IN (SELECT rowid FROM users_search WHERE users_search MATCH ?3)")
+            else:
+                # Trigrams need three characters; shorter queries scan
+                text = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                where = "WHERE employee_id >= ?1 AND employee_id < ?2 OR name LIKE ?3 ESCAPE '\\' OR email LIKE ?3 ESCAPE '\\'"
+            rows = conn.execute(f"SELECT * FROM users {where} ORDER BY employee_id LIMIT ?4 OFFSET ?5", (*id_range, text, *page))
+            total = conn.execute(f"SELECT COUNT(*) FROM users {where}", (*id_range, text)).fetchone()[0]
+        return [(row["employee_id"], self._user(row)) for row in rows], total
+
+    def role_counts(self):
+        """(total users, admin users)"""
+        return tuple(self._conn().execute("SELECT total, admins FROM user_role_counts").fetchone())
+
+    def update_user(self, user_id, **fields):
+        columns = [column for column in fields if column in USER_COLUMNS]
+        if not columns:
+            return
+        with self.transaction() as conn:
+            conn.execute(
+                f"UPDATE users SET {', '.join(f'{column} = ?' for column in columns)} WHERE employee_id = ?",
+                (*(fields[column] for column in columns), user_id)
+            )
+
+    def delete_user(self, user_id):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM users WHERE employee_id = ?", (user_id,))
+
+    # Notifications
+    def _notification(self, row):
+        return {"message": row["message"], "type": row["type"], "timestamp": row["timestamp"],
+                "read": bool(row["read"]), "id": row["id"]}
+
+    def load_notifications(self):
+        notifications = {}
+        for row in self._conn().execute(f"SELECT * FROM ({USER_NOTIFICATIONS}) ORDER BY id"):
+            notifications.setdefault(row["employee_id"], []).append(self._notification(row))
+        return notifications
+
+    def save_notifications(self, notifications):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM notification_recipients")
+            conn.execute("DELETE FROM notifications")
+            for user_id, user_notifications in notifications.items():
+                for notification in user_notifications:
+                    self.add_notification(user_id, notification)
+
+    def user_notifications(self, user_id, offset=0, limit=None):
+        rows = self._conn().execute(
+            f"SELECT * FROM ({USER_NOTIFICATIONS}) WHERE employee_id = ? ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+            (user_id, -1 if limit is None else limit, offset)
+        )
+        return [self._notification(row) for row in rows]
+
+    def count_notifications(self, user_id):
+        return self._conn().execute(
+            "SELECT (SELECT COUNT(*) FROM notifications WHERE employee_id = ?)"
+            " + (SELECT COUNT(*) FROM notification_recipients WHERE employee_id = ?)", (user_id, user_id)
+        ).fetchone()[0]
+
+    def unread_count(self, user_id):
+        return self._conn().execute(
+            "SELECT (SELECT COUNT(*) FROM notifications WHERE employee_id = ? AND read = 0)"
+            " + (SELECT COUNT(*) FROM notification_recipients WHERE employee_id = ? AND read = 0)", (user_id, user_id)
+        ).fetchone()[0]
+
+    def add_notification(self, user_id, notification):
+        with self.transaction() as conn:
+            return conn.execute(
+                "INSERT INTO notifications (employee_id, message, type, timestamp, read) VALUES (?, ?, ?, ?, ?)",
+                (user_id, notification["message"], notification["type"], notification["timestamp"],
+                 int(notification.get("read", False)))
+            ).lastrowid
+
+    def broadcast_notification(self, user_ids, notification):
+        with self.transaction() as conn:
+            notification_id = self.add_notification(BROADCAST, notification)
+            conn.executemany(
+                "INSERT INTO notification_recipients (employee_id, notification_id, read) VALUES (?, ?, ?)",
+                ((user_id, notification_id, int(notification.get("read", False))) for user_id in user_ids)
+            )
+            return notification_id
+
+    def mark_notification_read(self, user_id, notification_id):
+        with self.transaction() as conn:
+            conn.execute("UPDATE notifications SET read = 1 WHERE employee_id = ? AND id = ?", (user_id, notification_id))
+            conn.execute(
+                "UPDATE notification_recipients SET read = 1 WHERE employee_id = ? AND notification_id = ?",
+                (user_id, notification_id)
+            )
+
+    def delete_notification(self, user_id, notification_id):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM notifications WHERE employee_id = ? AND id = ?", (user_id, notification_id))
+            conn.execute(
+                "DELETE FROM notification_recipients WHERE employee_id = ? AND notification_id = ?",
+                (user_id, notification_id)
+            )
+            # Drop a broadcast's message once its last recipient has deleted it
+            conn.execute(
+                "DELETE FROM notifications WHERE id = ? AND employee_id = ? AND NOT EXISTS "
+                "(SELECT 1 FROM notification_recipients WHERE notification_id = ?)",
+                (notification_id, BROADCAST, notification_id)
+            )
+
+    # Registration requests
+    def load_registration_requests(self):
+        rows = self._conn().execute("SELECT * FROM registration_requests ORDER BY timestamp")
+        return freeze({row["employee_id"]: {column: row[column] for column in REQUEST_COLUMNS} for row in rows})
+
+    def save_registration_requests(self, requests):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM registration_requests")
+            for user_id, request in requests.items():
+                self.put_registration_request(user_id, request)
+
+    def get_registration_request(self, user_id):
+        row = self._conn().execute("SELECT * FROM registration_requests WHERE employee_id = ?", (user_id,)).fetchone()
+        return freeze({column: row[column] for column in REQUEST_COLUMNS}) if row else None
+
+    def put_registration_request(self, user_id, request):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO registration_requests (employee_id, name, email, password, timestamp, status) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, *(request[column] for column in REQUEST_COLUMNS))
+            )
+
+    def set_registration_status(self, user_id, status):
+        with self.transaction() as conn:
+            conn.execute("UPDATE registration_requests SET status = ? WHERE employee_id = ?", (status, user_id))
+
+    def delete_registration_request(self, user_id):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM registration_requests WHERE employee_id = ?", (user_id,))
+
+    def process_registration_requests(self, approved_users, rejected_ids, notification=None):
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (employee_id, password, is_admin, name, email) VALUES (?, ?, ?, ?, ?)",
+                ((user_id, user["password"], int(user.get("is_admin", False)), user.get("name", ""), user.get("email", ""))
+                 for user_id, user in approved_users.items())
+            )
+            conn.executemany(
+                "DELETE FROM registration_requests WHERE employee_id = ?",
+                ((user_id,) for user_id in [*approved_users, *rejected_ids])
+            )
+            conn.execute(
+                "DELETE FROM registration_requests WHERE status != 'pending' "
+                "OR employee_id IN (SELECT employee_id FROM users)"
+            )
+            if approved_users and notification is not None:
+                self.broadcast_notification(list(approved_users), notification)
+
+    # Password reset requests
+    def load_password_reset_requests(self):
+        rows = self._conn().execute("SELECT * FROM password_reset_requests ORDER BY timestamp")
+        return freeze({row["employee_id"]: {"timestamp": row["timestamp"], "expires_at": row["expires_at"]} for row in rows})
+
+    def save_password_reset_requests(self, requests):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM password_reset_requests")
+            for user_id, request in requests.items():
+                self.put_password_reset_request(user_id, request)
+
+    def put_password_reset_request(self, user_id, request):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO password_reset_requests (employee_id, timestamp, expires_at) VALUES (?, ?, ?)",
+                (user_id, request["timestamp"], request["expires_at"])
+            )
+
+    def delete_password_reset_request(self, user_id):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM password_reset_requests WHERE employee_id = ?", (user_id,))
+
+    def expire_password_reset_requests(self, now):
+        # Probe the expires_at index first so the usual nothing-expired case takes no write lock
+        expired = self._conn().execute(
+            "SELECT 1 FROM password_reset_requests WHERE expires_at <= ? LIMIT 1", (now,)
+        ).fetchone()
+        if expired is None:
+            return
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM password_reset_requests WHERE expires_at <= ?", (now,))
+
+    def pending_password_reset_requests(self, now):
+        self.expire_password_reset_requests(now)
+        return list(self.load_password_reset_requests().items())
+
+    def count_password_reset_requests(self, now):
+        self.expire_password_reset_requests(now)
+        return self._conn().execute("SELECT COUNT(*) FROM password_reset_requests").fetchone()[0]
+
+_storage = None
+_storage_lock = threading.Lock()
+
+def get_storage():
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = SqliteStorage() if STORAGE_BACKEND == "sqlite" else JsonStorage()
+        return _storage
+
+def migrate_json_to_sqlite(source, target):
+    # One-shot copy of every JSON store into SQLite inside a single transaction
+    users = source.load_users()
+    requests = source.load_registration_requests()
+    notifications = source.load_notifications()
+    reset_requests = source.load_password_reset_requests()
+    with target.transaction():
+        target.save_users(users)
+        target.save_registration_requests(requests)
+        target.save_notifications(notifications)
+        target.save_password_reset_requests(reset_requests)
+    return len(users), len(requests), sum(len(n) for n in notifications.values())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copy the JSON stores (users, notifications, registration and password reset requests) into SQLite")
+    parser.add_argument("--db", default=str(SQLITE_PATH))
+    args = parser.parse_args(argv)
+    users, requests, notifications = migrate_json_to_sqlite(JsonStorage(), SqliteStorage(args.db))
+    print(f"Migrated {users} users, {requests} registration requests and {notifications} notifications to {args.db}")
+    print("Set AIDEAS_STORAGE=sqlite to use it")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,8 @@
+import os
+import sys
+from pathlib import Path
+
+# The app's modules live at the repository root and read their data files relative to it
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
@@ -0,0 +1,39 @@
+import pytest
+
+import blob_store
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    monkeypatch.setattr(blob_store, "BLOB_DIR", tmp_path)
+    monkeypatch.setattr(blob_store, "_index", None)
+    monkeypatch.setattr(blob_store, "_store_bytes", 0)
+    monkeypatch.setattr(blob_store, "_session_refs", {})
+    monkeypatch.setattr(blob_store, "_session_seen", {})
+    return blob_store
+
+def test_open_blob_closes_in_a_with_block(store):
+    digest = store.put_blob(b"image bytes")
+    with store.open_blob(digest) as data:
+        assert data.read() == b"image bytes"
+    assert data.closed
+
+def test_touched_sessions_keep_their_blobs(store, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(store.time, "monotonic", lambda: now[0])
+    active, idle = store.put_blob(b"active"), store.put_blob(b"idle")
+    store.retain_blobs("active", [active])
+    store.retain_blobs("idle", [idle])
+    now[0] += store.SESSION_IDLE_SECONDS
+    store.touch_session("active")
+    now[0] += 1
+    store.retain_blobs("other", [])
+    assert store.blob_path(active).exists()
+    assert not store.blob_path(idle).exists()
+
+def test_release_session_deletes_only_unshared_blobs(store):
+    mine, shared = store.put_blob(b"mine"), store.put_blob(b"shared")
+    store.retain_blobs("a", [mine, shared])
+    store.retain_blobs("b", [shared])
+    store.release_session("a")
+    assert not store.blob_path(mine).exists()
+    assert store.blob_path(shared).exists()
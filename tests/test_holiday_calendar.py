@@ -0,0 +1,17 @@
+import pytest
+
+import holiday_calendar
+
+def test_missing_holidays_file_warns(monkeypatch, tmp_path):
+    monkeypatch.setattr(holiday_calendar, "HOLIDAYS_FILE", tmp_path / "holidays.json")
+    holiday_calendar.load_holidays.cache_clear()
+    try:
+        with pytest.warns(UserWarning, match="holidays.json not found"):
+            assert holiday_calendar.load_holidays() == {}
+    finally:
+        holiday_calendar.load_holidays.cache_clear()
+
+def test_holidays_file_does_not_depend_on_working_directory(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    holiday_calendar.load_holidays.cache_clear()
+    assert holiday_calendar.available_years()
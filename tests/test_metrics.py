@@ -0,0 +1,65 @@
+import pytest
+
+from app import DEFAULT_MANAGER, TimesheetMetrics, calculate_metrics, create_timesheet, metrics_arrays, rollup_metrics
+from holiday_calendar import DEFAULT_LOCATION, get_holidays
+
+EMPLOYEE = {"name": "Test User", "id": "100298", "location": DEFAULT_LOCATION, "manager": DEFAULT_MANAGER}
+
+def iterrows_metrics(df, year):
+    # The per-row counts calculate_metrics used before it was vectorized
+    holidays = get_holidays(year).values()
+    working_days = len([row for _, row in df.iterrows() if row['Job Description'] not in ['Sick Leave', 'Earned Leave'] and 'Week Off' not in row['Job Description'] and row['Job Description'] not in holidays])
+    sick_leaves = len([row for _, row in df.iterrows() if row['Job Description'] == 'Sick Leave'])
+    earned_leaves = len([row for _, row in df.iterrows() if row['Job Description'] == 'Earned Leave'])
+    wfh_days = len([row for _, row in df.iterrows() if row['WFO/WFH'] == 'WFH'])
+    wfo_days = len([row for _, row in df.iterrows() if row['WFO/WFH'] == 'WFO'])
+    return working_days, sick_leaves, earned_leaves, wfh_days, wfo_days
+
+def worked_hours(df):
+    return sum(row['Hours'] for _, row in df.iterrows() if row['DayType'] == 'Working') / 60
+
+def month_timesheet(month, year=2025):
+    # Mixed month: two WFH days, a sick day, an earned leave day, and one of each on a weekend or holiday
+    dates = [f"{month:02d}/{day:02d}/{year}" for day in (3, 4, 7, 8, 9, 10)]
+    leave = {dates[0]: "Sick Leave", dates[1]: "Earned Leave", dates[4]: "Sick Leave"}
+    return create_timesheet(year, month, EMPLOYEE, ["Proj A", "Proj B"], leave, [dates[2], dates[3], dates[5]])
+
+@pytest.mark.parametrize("month", range(1, 13))
+def test_calculate_metrics_matches_iterrows_counts(month):
+    df = month_timesheet(month)
+    metrics = calculate_metrics(df)
+    assert tuple(metrics[:5]) == iterrows_metrics(df, 2025)
+    assert metrics.sick_leaves + metrics.earned_leaves > 0
+    assert metrics.wfh_days > 0
+    assert metrics.total_hours == pytest.approx(worked_hours(df))
+    assert metrics.avg_hours_per_day == pytest.approx(worked_hours(df) / metrics.working_days)
+
+def test_quarter_rollup_sums_its_months():
+    timesheets = {}
+    for employee_id in ("100298", "100300"):
+        for month in range(1, 7):
+            timesheets[(employee_id, 2025, month)] = create_timesheet(
+                2025, month, dict(EMPLOYEE, id=employee_id), ["Proj A"],
+                {f"{month:02d}/05/2025": "Earned Leave"}, [f"{month:02d}/12/2025"]
+            )
+    totals = rollup_metrics(timesheets, "quarter")
+    assert list(totals.index) == [("100298", 2025, 1), ("100298", 2025, 2), ("100300", 2025, 1), ("100300", 2025, 2)]
+    for (employee_id, year, quarter), row in totals.iterrows():
+        months = [timesheets[(employee_id, year, month)] for month in range(quarter * 3 - 2, quarter * 3 + 1)]
+        expected = [sum(counts) for counts in zip(*(iterrows_metrics(df, year) for df in months))]
+        assert [row[field] for field in ("working_days", "sick_leaves", "earned_leaves", "wfh_days", "wfo_days")] == expected
+        hours = sum(worked_hours(df) for df in months)
+        assert row["total_hours"] == pytest.approx(hours)
+        assert row["avg_hours_per_day"] == pytest.approx(hours / expected[0])
+
+def test_rollup_rejects_unknown_period():
+    with pytest.raises(ValueError):
+        rollup_metrics({("100298", 2025, 1): month_timesheet(1)}, "week")
+
+def test_empty_inputs_give_zeroed_metrics():
+    metrics = calculate_metrics(month_timesheet(1).iloc[:0])
+    assert tuple(metrics) == (0, 0, 0, 0, 0, 0.0, 0.0)
+    assert all(len(values) == 0 for values in metrics_arrays([]).values())
+    totals = rollup_metrics({}, "quarter")
+    assert totals.empty
+    assert list(totals.columns) == list(TimesheetMetrics._fields)
@@ -0,0 +1,26 @@
+import threading
+
+import passwords
+
+def test_unknown_user_runs_a_full_check_and_never_matches(monkeypatch):
+    checked = []
+    check = passwords._check
+    monkeypatch.setattr(passwords, "_check", lambda password, stored: checked.append(stored) or check(password, stored))
+    assert passwords.verify_password("secret", None) == (False, None)
+    assert checked == [passwords._DUMMY_HASH]
+
+def test_bulk_hashing_leaves_room_for_sign_ins(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(passwords, "_encode", lambda password: release.wait() and "hashed")
+    bulk = threading.Thread(target=passwords.hash_passwords, args=(["p"] * 50,))
+    bulk.start()
+    try:
+        for _ in range(200):
+            if passwords._bulk_pending._value == 0:
+                break
+            threading.Event().wait(0.01)
+        # The import is stuck on its own share of the queue; the rest is free for sign-ins
+        assert passwords._pending._value == passwords.MAX_PENDING - passwords.MAX_BULK_PENDING
+    finally:
+        release.set()
+        bulk.join()
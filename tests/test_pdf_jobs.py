@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import CancelledError
+
+import pandas as pd
+import pytest
+
+import pdf_cache
+import pdf_jobs
+
+@pytest.fixture
+def jobs(monkeypatch):
+    # Jobs run in this process; the render reports progress (where cancellation lands) until released
+    release = threading.Event()
+
+    def render(number, args):
+        while not release.wait(0.01):
+            if pdf_jobs._cancelled[number % pdf_jobs.CANCEL_SLOTS] == number:
+                raise pdf_jobs.JobCancelled()
+        return b"%PDF " + args[2].encode()
+
+    monkeypatch.setattr(pdf_jobs, "PDF_JOB_EXECUTOR", "thread")
+    monkeypatch.setattr(pdf_jobs, "_render", render)
+    monkeypatch.setattr(pdf_jobs, "_executor", None)
+    pdf_cache.clear_pdf_cache()
+    yield release
+    release.set()
+    pdf_cache.clear_pdf_cache()
+
+def submit(key):
+    return pdf_jobs.submit_pdf(key, pd.DataFrame({"Day": [1]}), {}, key)
+
+def test_submit_renders_once_and_caches(jobs):
+    job_id = submit("a")
+    assert submit("a") == job_id
+    assert pdf_jobs.job_status(job_id).state in ("queued", "running")
+    jobs.set()
+    assert pdf_jobs.job_result(job_id, timeout=5) == b"%PDF a"
+    assert pdf_cache.get_cached_pdf("a") == b"%PDF a"
+
+def test_cancel(jobs):
+    job_id = submit("b")
+    pdf_jobs.cancel_job(job_id)
+    with pytest.raises(CancelledError):
+        pdf_jobs.job_result(job_id, timeout=5)
+    assert pdf_jobs.job_status(job_id).state == "cancelled"
+    assert pdf_cache.get_cached_pdf("b") is None
+
+def test_cache_hit_allocates_no_job(jobs):
+    pdf_cache.store_pdf("c", b"%PDF cached")
+    jobs_before = len(pdf_jobs._jobs)
+    job_id = submit("c")
+    assert len(pdf_jobs._jobs) == jobs_before
+    assert pdf_jobs.job_status(job_id).state == "done"
+    assert pdf_jobs.job_result(job_id) == b"%PDF cached"
+    pdf_cache.clear_pdf_cache()
+    assert pdf_jobs.job_status(job_id) is None
@@ -0,0 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app import DEFAULT_MANAGER, create_pdf, create_timesheet
+from holiday_calendar import DEFAULT_LOCATION
+from pdf_template import pdf_size_report, pdf_template
+
+EMPLOYEE = {"name": "Test User", "id": "100298", "location": DEFAULT_LOCATION, "manager": DEFAULT_MANAGER}
+
+def test_each_document_gets_its_own_logo_flowable():
+    template = pdf_template()
+    assert template.logo() is not template.logo()
+    assert template.logo()._image is template.logo_image
+
+def test_concurrent_renders_match_serial_ones():
+    # Thread-mode PDF jobs render in parallel against the one process-wide template
+    frames = [create_timesheet(2025, month, EMPLOYEE, ["Proj A"], {}, []) for month in range(1, 7)]
+    serial = [pdf_size_report(create_pdf(df, EMPLOYEE, (month, 2025))) for month, df in enumerate(frames, 1)]
+    with ThreadPoolExecutor(6) as executor:
+        concurrent = list(executor.map(lambda month: pdf_size_report(create_pdf(frames[month - 1], EMPLOYEE, (month, 2025))),
+                                       [month for _ in range(4) for month in range(1, 7)]))
+    assert concurrent == serial * 4
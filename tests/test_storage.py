@@ -0,0 +1,57 @@
+from types import MappingProxyType
+
+import pytest
+
+from storage import JsonStorage, SqliteStorage
+
+USER = {"password": "x", "is_admin": True, "name": "Test User", "email": "test@example.com"}
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SqliteStorage(tmp_path / "aideas.db")
+    return JsonStorage(
+        users_file=tmp_path / "users.json",
+        notifications_file=tmp_path / "notifications.json",
+        registration_requests_file=tmp_path / "registration_requests.json",
+        notification_log_file=tmp_path / "notifications.log",
+        password_reset_requests_file=tmp_path / "password_reset_requests.json",
+    )
+
+def test_loads_are_read_only_snapshots_that_save_back(store):
+    store.put_user("100298", USER)
+    store.put_password_reset_request("100298", {"timestamp": "t", "expires_at": "9999"})
+    users = store.load_users()
+    assert isinstance(users, MappingProxyType) and isinstance(store.get_user("100298"), MappingProxyType)
+    store.save_users(users)
+    store.save_password_reset_requests(store.load_password_reset_requests())
+    assert dict(store.load_users()["100298"]) == USER
+    assert list(store.load_password_reset_requests()) == ["100298"]
+
+def test_search_matches_id_prefixes_and_name_or_email_substrings(store):
+    store.put_users({
+        "100298": dict(USER, name="Kishore Patil", email="kishore@example.com"),
+        "100300": dict(USER, name="Sooraj S", email="sooraj@example.com", is_admin=False),
+        "200298": dict(USER, name="Santhosh N", email="santhosh@example.com", is_admin=False),
+    })
+    assert [user_id for user_id, _ in store.search_users("1003")[0]] == ["100300"]
+    # Ids match by prefix only; names and emails by case-insensitive substring
+    assert store.search_users("0298")[1] == 0
+    assert [user_id for user_id, _ in store.search_users("PATIL")[0]] == ["100298"]
+    assert [user_id for user_id, _ in store.search_users("example", 1, 1)[0]] == ["100300"]
+    assert store.search_users("example")[1] == 3
+
+def test_user_index_picks_up_another_process_writes(tmp_path):
+    def open_store():
+        return JsonStorage(users_file=tmp_path / "users.json", notification_log_file=tmp_path / "notifications.log",
+                           notifications_file=tmp_path / "notifications.json",
+                           registration_requests_file=tmp_path / "registration_requests.json",
+                           password_reset_requests_file=tmp_path / "password_reset_requests.json")
+    store, other = open_store(), open_store()
+    store.put_users({"1": dict(USER, name="Old Name", is_admin=False), "2": dict(USER, is_admin=False)})
+    assert store.role_counts() == (2, 0)
+    other.update_user("1", name="New Name", is_admin=True)
+    store.put_user("3", dict(USER, name="Three", is_admin=False))
+    assert store.search_users("new name")[1] == 1
+    assert store.search_users("old name")[1] == 0
+    assert store.role_counts() == (3, 1)
@@ -0,0 +1,48 @@
+import multiprocessing
+from pathlib import Path
+
+from storage import JsonStorage
+
+PROCESSES = 80
+WRITES_PER_PROCESS = 5
+
+def open_store(directory):
+    directory = Path(directory)
+    return JsonStorage(
+        users_file=directory / "users.json",
+        notifications_file=directory / "notifications.json",
+        registration_requests_file=directory / "registration_requests.json",
+        notification_log_file=directory / "notifications.log",
+        password_reset_requests_file=directory / "password_reset_requests.json",
+    )
+
+def write_rows(directory, worker, start):
+    store = open_store(directory)
+    start.wait()
+    # Files start missing: the first loads race to create them while other processes commit their writes
+    store.load_users()
+    for i in range(WRITES_PER_PROCESS):
+        user_id = f"{worker}-{i}"
+        store.put_user(user_id, {"password": "x", "is_admin": False, "name": user_id, "email": ""})
+        store.add_notification("100298", {"message": user_id, "type": "info", "timestamp": "", "read": False})
+
+def test_concurrent_writers_lose_no_updates(tmp_path):
+    # Separate processes, released together, all read-modify-writing the same store files
+    context = multiprocessing.get_context("fork")
+    start = context.Event()
+    processes = [context.Process(target=write_rows, args=(tmp_path, worker, start)) for worker in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    start.set()
+    for process in processes:
+        process.join(120)
+        assert process.exitcode == 0
+
+    store = open_store(tmp_path)
+    expected = {f"{worker}-{i}" for worker in range(PROCESSES) for i in range(WRITES_PER_PROCESS)}
+    assert set(store.load_users()) == expected
+    notifications = store.load_notifications()["100298"]
+    assert sorted(notification["message"] for notification in notifications) == sorted(expected)
+    assert len({notification["id"] for notification in notifications}) == len(expected)
+    # Every commit renamed its temp file into place
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,48 @@
+from bisect import bisect_left, insort
+
+class UserIndex:
+    """Sorted employee ids, lower-cased name and email text and role counts for one users snapshot."""
+
+    def __init__(self, users):
+        self.ids = sorted(users)
+        self.text = {user_id: self._text(user) for user_id, user in users.items()}
+        self.admin_ids = {user_id for user_id, user in users.items() if user.get("is_admin", False)}
+
+    def _text(self, user):
+        return f"{user.get('name', '')}\n{user.get('email', '')}".lower()
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Incremental updates for writes made by this process
+    def put(self, user_id, user):
+        if user_id not in self.text:
+            insort(self.ids, user_id)
+        self.text[user_id] = self._text(user)
+        if user.get("is_admin", False):
+            self.admin_ids.add(user_id)
+        else:
+            self.admin_ids.discard(user_id)
+
+    def remove(self, user_id):
+        if self.text.pop(user_id, None) is None:
+            return
+        del self.ids[bisect_left(self.ids, user_id)]
+        self.admin_ids.discard(user_id)
+
+    def role_counts(self):
+        return len(self.ids), len(self.admin_ids)
+
+    def search(self, query="", offset=0, limit=None):
+        """Employee ids starting with query, or whose name or email contains it case-insensitively, sorted,
+        plus the match count."""
+        query = query.strip()
+        stop = None if limit is None else offset + limit
+        if not query:
+            return self.ids[offset:stop], len(self.ids)
+        # Id prefixes are one bisected range of the sorted ids; only names and emails need the scan
+        id_matches = self.ids[bisect_left(self.ids, query):bisect_left(self.ids, query + "\U0010ffff")]
+        lowered = query.lower()
+        text_matches = [user_id for user_id, text in self.text.items() if lowered in text]
+        matches = sorted(set(id_matches).union(text_matches)) if text_matches else id_matches
+        return matches[offset:stop], len(matches)